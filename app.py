@@ -1,35 +1,129 @@
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, Response, render_template, request, jsonify, send_file
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
-import json
+import gzip
+import orjson
 import os
+import re
+import threading
+import time
+from string import Template
 from diagnose_website import diagnose_site, generate_technical_observation, diagnose_multiple_sites
-from urllib.parse import urlparse
 from excel_export import export_single_result_to_excel, export_bulk_results_to_excel, export_company_list_to_excel
 from google_sheets_export import export_single_result_to_gsheet, export_bulk_results_to_gsheet, export_company_list_to_gsheet
 from csv_parser import validate_csv_file
 from werkzeug.utils import secure_filename
 from bulk_processor import bulk_processor
-from email_service import send_email
+from email_service import send_email, send_bulk_emails
+from results_store import FLASK_DEBUG, RESULTS_DIR, get_safe_filename, read_result_file, read_result_bytes, serialize_result, splice_json_fields, write_result_file_async, delete_result_file, query_result_summaries, iter_indexed_results, average_load_time, result_index_generation
+
+
+class ORJSONProvider(JSONProvider):
+    """Serve jsonify() and request.get_json() through orjson."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 CORS(app)  # Enable CORS to allow requests from different ports/origins
 
-def get_safe_filename(url):
-    """Convert URL to safe filename."""
-    try:
-        parsed = urlparse(url)
-        domain = parsed.netloc or parsed.path.split('/')[0]
-        # Remove www. and replace dots/special chars
-        domain = domain.replace('www.', '').replace('.', '_').replace('/', '_').replace(':', '_')
-        # Remove any remaining invalid characters
-        domain = ''.join(c if c.isalnum() or c in ('_', '-') else '_' for c in domain)
-        # Limit length
-        domain = domain[:50]
-        return f"diagnosis_{domain}.json"
-    except:
-        # Fallback to timestamp if parsing fails
-        import time
-        return f"diagnosis_{int(time.time())}.json"
+# Rendered /results bodies keyed by query string, valid for one index generation
+LIST_CACHE_SIZE = 256
+_list_cache = {'generation': None, 'bodies': {}}
+_list_cache_lock = threading.Lock()
+
+# Protocols accepted as-is on submitted URLs
+_URL_SCHEMES = ('http://', 'https://')
+
+# Recent /diagnose response bodies keyed by URL -> (timestamp, body)
+DIAGNOSE_CACHE_TTL = 300  # seconds
+_diagnose_cache = {}
+# URLs currently being diagnosed -> Event set when the diagnosis finishes
+_diagnoses_in_flight = {}
+_diagnose_lock = threading.Lock()
+
+
+def _claim_diagnosis(url):
+    """
+    Claim a URL for diagnosis.
+    
+    Returns the cached response body if the URL was diagnosed within the TTL (waiting
+    for an in-flight diagnosis of the same URL first), otherwise None and the
+    caller owns the diagnosis until it calls _release_diagnosis().
+    """
+    while True:
+        with _diagnose_lock:
+            cached = _diagnose_cache.get(url)
+            if cached and time.time() - cached[0] < DIAGNOSE_CACHE_TTL:
+                return cached[1]
+            event = _diagnoses_in_flight.get(url)
+            if event is None:
+                _diagnoses_in_flight[url] = threading.Event()
+                return None
+        event.wait()
+
+
+def _release_diagnosis(url, result=None, body=None):
+    """Finish a claimed diagnosis, caching its response body if it completed cleanly."""
+    now = time.time()
+    with _diagnose_lock:
+        if result is not None and result.get('status') in ('clean', 'at_risk'):
+            _diagnose_cache[url] = (now, body)
+        # Drop expired entries so the cache only holds recent URLs
+        for key in [k for k, (ts, _) in _diagnose_cache.items() if now - ts >= DIAGNOSE_CACHE_TTL]:
+            del _diagnose_cache[key]
+        event = _diagnoses_in_flight.pop(url, None)
+    if event is not None:
+        event.set()
+
+
+# Path separators or parent references in a requested result filename
+_UNSAFE_RESULT_NAME = re.compile(r'[/\\]|\.\.')
+
+
+def _safe_result_path(filename):
+    """
+    Resolve a result filename to its path under results/.
+    Returns None for anything that isn't a plain .json name inside the
+    directory, including symlinks that point out of it.
+    """
+    if _UNSAFE_RESULT_NAME.search(filename) or not filename.endswith('.json'):
+        return None
+    filepath = os.path.join(RESULTS_DIR, filename)
+    results_root = os.path.realpath(RESULTS_DIR)
+    if not os.path.realpath(filepath).startswith(results_root + os.sep):
+        return None
+    return filepath
+
+
+# JSON bodies smaller than this are sent uncompressed
+GZIP_MIN_SIZE = 1024
+
+
+@app.after_request
+def compress_json_response(response):
+    """Gzip JSON responses for clients that accept it (results are highly repetitive)."""
+    if (response.mimetype != 'application/json'
+            or response.status_code in (204, 304)
+            or response.direct_passthrough
+            or 'Content-Encoding' in response.headers):
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    if not request.accept_encodings.quality('gzip'):
+        return response
+    
+    body = response.get_data()
+    if len(body) < GZIP_MIN_SIZE:
+        return response
+    response.set_data(gzip.compress(body, compresslevel=6))
+    response.headers['Content-Encoding'] = 'gzip'
+    return response
 
 
 @app.route('/')
@@ -47,50 +141,54 @@ def diagnose():
             return jsonify({'error': 'URL is required'}), 400
         
         # Ensure URL has protocol
-        if not url.startswith(('http://', 'https://')):
-            url = 'https://' + url
+        if not url.startswith(_URL_SCHEMES):
+            url = f'https://{url}'
+        
+        # Serve a recent diagnosis of the same URL, or wait for one in progress
+        cached = _claim_diagnosis(url)
+        if cached is not None:
+            return Response(cached, mimetype='application/json')
         
-        # Run diagnosis
+        finished = body = None
         try:
-            result = diagnose_site(url)
-        except Exception as e:
-            # Log the error for debugging
-            import traceback
-            error_trace = traceback.format_exc()
-            print(f"Diagnosis error: {error_trace}")
-            return jsonify({
-                'error': f'Diagnosis failed: {str(e)}',
-                'details': error_trace if os.environ.get('FLASK_DEBUG') else None
-            }), 500
-        
-        # Generate technical observation if vulnerabilities detected
-        if result.get("vulnerability_detected", False):
+            # Run diagnosis
             try:
-                observation = generate_technical_observation(result)
-                if observation:
-                    result["technical_observation"] = observation
+                result = diagnose_site(url)
             except Exception as e:
-                # Don't fail if observation generation fails
-                print(f"Observation generation failed: {str(e)}")
-        
-        # Save to file with URL-based name
-        filename = get_safe_filename(url)
-        filepath = os.path.join('results', filename)
-        
-        # Create results directory if it doesn't exist
-        os.makedirs('results', exist_ok=True)
-        
-        try:
-            with open(filepath, 'w') as f:
-                json.dump(result, f, indent=2)
-        except Exception as e:
-            print(f"Failed to save result: {str(e)}")
-            # Continue even if save fails
-        
-        result['output_file'] = filename
-        result['output_path'] = filepath
-        
-        return jsonify(result)
+                # Log the error for debugging
+                import traceback
+                error_trace = traceback.format_exc()
+                print(f"Diagnosis error: {error_trace}")
+                return jsonify({
+                    'error': f'Diagnosis failed: {str(e)}',
+                    'details': error_trace if FLASK_DEBUG else None
+                }), 500
+        
+            # Generate technical observation if vulnerabilities detected
+            if result.get("vulnerability_detected", False):
+                try:
+                    observation = generate_technical_observation(result)
+                    if observation:
+                        result["technical_observation"] = observation
+                except Exception as e:
+                    # Don't fail if observation generation fails
+                    print(f"Observation generation failed: {str(e)}")
+        
+            # Save to file with URL-based name
+            filename = get_safe_filename(url)
+            filepath = os.path.join(RESULTS_DIR, filename)
+        
+            # Encoded once: the same bytes are saved and, with the output
+            # fields appended, sent back. Written in the background so the
+            # response doesn't wait on disk; failures are only logged.
+            stored = serialize_result(result)
+            write_result_file_async(filepath, result, body=stored)
+        
+            body = splice_json_fields(stored, {'output_file': filename, 'output_path': filepath})
+            finished = result
+            return Response(body, mimetype='application/json')
+        finally:
+            _release_diagnosis(url, finished, body)
     
     except Exception as e:
         import traceback
@@ -98,7 +196,7 @@ def diagnose():
         print(f"Request error: {error_trace}")
         return jsonify({
             'error': str(e),
-            'details': error_trace if os.environ.get('FLASK_DEBUG') else None
+            'details': error_trace if FLASK_DEBUG else None
         }), 500
 
 
@@ -106,8 +204,7 @@ def diagnose():
 def list_results():
     """List all saved diagnosis results with pagination, search, filter, and sort."""
     try:
-        results_dir = 'results'
-        os.makedirs(results_dir, exist_ok=True)
+        results_dir = RESULTS_DIR
         
         # Get query parameters
         page = int(request.args.get('page', 1))
@@ -118,89 +215,42 @@ def list_results():
         sort_by = request.args.get('sort', 'date')  # date, domain, status, vulnerabilities
         sort_order = request.args.get('order', 'desc')  # asc, desc
         
-        files = []
-        load_times = []
-        
-        for filename in os.listdir(results_dir):
-            if filename.endswith('.json'):
-                filepath = os.path.join(results_dir, filename)
-                try:
-                    # Get file stats
-                    stat = os.stat(filepath)
-                    
-                    # Read the result to get basic info
-                    with open(filepath, 'r') as f:
-                        data = json.load(f)
-                    
-                    domain = data.get('domain', '')
-                    tech = data.get('tech', 'Unknown')
-                    status = data.get('status', 'unknown')
-                    load_time = data.get('load_time', 'N/A')
-                    vulnerability_detected = data.get('vulnerability_detected', False)
-                    vulnerabilities_count = len(data.get('vulnerabilities', []))
-                    
-                    # Collect load times for statistics (only numeric values)
-                    if load_time != 'N/A':
-                        try:
-                            # Extract numeric value from load_time (e.g., "2.3s" -> 2.3)
-                            load_time_num = float(load_time.replace('s', '').strip())
-                            load_times.append(load_time_num)
-                        except:
-                            pass
-                    
-                    files.append({
-                        'filename': filename,
-                        'url': data.get('url', ''),
-                        'domain': domain,
-                        'tech': tech,
-                        'status': status,
-                        'load_time': load_time,
-                        'console_error_count': data.get('console_error_count', 0),
-                        'vulnerability_detected': vulnerability_detected,
-                        'vulnerabilities_count': vulnerabilities_count,
-                        'modified': stat.st_mtime
-                    })
-                except Exception as e:
-                    # Skip corrupted files
-                    continue
-        
-        # Apply search filter
-        if search:
-            files = [f for f in files if search in f['domain'].lower() or search in f['tech'].lower()]
-        
-        # Apply status filter
-        if status_filter:
-            files = [f for f in files if f['status'] == status_filter]
-        
-        # Apply vulnerability filter
-        if vulnerability_filter == 'yes':
-            files = [f for f in files if f['vulnerability_detected']]
-        elif vulnerability_filter == 'no':
-            files = [f for f in files if not f['vulnerability_detected']]
-        
-        # Apply sorting
-        if sort_by == 'date':
-            files.sort(key=lambda x: x['modified'], reverse=(sort_order == 'desc'))
-        elif sort_by == 'domain':
-            files.sort(key=lambda x: x['domain'].lower(), reverse=(sort_order == 'desc'))
-        elif sort_by == 'status':
-            files.sort(key=lambda x: x['status'], reverse=(sort_order == 'desc'))
-        elif sort_by == 'vulnerabilities':
-            files.sort(key=lambda x: x['vulnerabilities_count'], reverse=(sort_order == 'desc'))
-        
-        # Calculate statistics
-        total_count = len(files)
-        with_vulnerabilities = sum(1 for f in files if f['vulnerability_detected'])
+        # Repeat queries (pagination clicks, polling) are served from memory
+        # until a result is saved, deleted or changed on disk
+        generation = result_index_generation(results_dir)
+        cache_key = request.query_string
+        with _list_cache_lock:
+            if _list_cache['generation'] != generation:
+                _list_cache['generation'] = generation
+                _list_cache['bodies'] = {}
+            body = _list_cache['bodies'].get(cache_key)
+        if body is not None:
+            return Response(body, mimetype='application/json')
+        
+        # Filtering, sorting and pagination all run against the summary index
+        rows, total_count, with_vulnerabilities = query_result_summaries(
+            results_dir,
+            search=search,
+            status=status_filter,
+            vulnerability=vulnerability_filter,
+            sort_by=sort_by,
+            sort_order=sort_order,
+            limit=limit,
+            offset=(page - 1) * limit
+        )
+        paginated_files = [
+            {'filename': filename, **summary, 'modified': modified}
+            for filename, modified, summary in rows
+        ]
+        
+        # Calculate statistics (average load time covers all results, unfiltered)
         without_vulnerabilities = total_count - with_vulnerabilities
-        avg_load_time = sum(load_times) / len(load_times) if load_times else 0
+        avg_load_time = average_load_time(results_dir)
         
-        # Apply pagination
-        total_pages = (total_count + limit - 1) // limit  # Ceiling division
-        start_idx = (page - 1) * limit
-        end_idx = start_idx + limit
-        paginated_files = files[start_idx:end_idx]
+        # Ceiling division
+        total_pages = (total_count + limit - 1) // limit
         
-        return jsonify({
+        body = orjson.dumps({
             'results': paginated_files,
             'pagination': {
                 'page': page,
@@ -217,6 +267,13 @@ def list_results():
                 'avg_load_time': f"{avg_load_time:.1f}s" if avg_load_time > 0 else "N/A"
             }
         })
+        
+        with _list_cache_lock:
+            if _list_cache['generation'] == generation:
+                if len(_list_cache['bodies']) >= LIST_CACHE_SIZE:
+                    _list_cache['bodies'].clear()
+                _list_cache['bodies'][cache_key] = body
+        return Response(body, mimetype='application/json')
     
     except Exception as e:
         import traceback
@@ -230,19 +287,27 @@ def get_result(filename):
     """Get a specific diagnosis result."""
     try:
         # Security: prevent directory traversal
-        if '..' in filename or '/' in filename or '\\' in filename:
+        filepath = _safe_result_path(filename)
+        if filepath is None:
             return jsonify({'error': 'Invalid filename'}), 400
         
-        filepath = os.path.join('results', filename)
-        
-        if not os.path.exists(filepath):
+        try:
+            stat = os.stat(filepath)
+        except FileNotFoundError:
             return jsonify({'error': 'Result not found'}), 404
         
-        with open(filepath, 'r') as f:
-            data = json.load(f)
-        
-        data['output_file'] = filename
-        return jsonify(data)
+        # Re-diagnosing a URL overwrites its file, so clients must revalidate;
+        # unchanged files are answered with a bodiless 304
+        etag = f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+        else:
+            # The stored file is already JSON; send it without a parse/serialize round trip
+            body = read_result_bytes(filepath, {'output_file': filename}, stat=stat)
+            response = Response(body, mimetype='application/json')
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -253,15 +318,14 @@ def delete_result(filename):
     """Delete a specific diagnosis result."""
     try:
         # Security: prevent directory traversal
-        if '..' in filename or '/' in filename or '\\' in filename:
+        filepath = _safe_result_path(filename)
+        if filepath is None:
             return jsonify({'error': 'Invalid filename'}), 400
         
-        filepath = os.path.join('results', filename)
-        
         if not os.path.exists(filepath):
             return jsonify({'error': 'Result not found'}), 404
         
-        os.remove(filepath)
+        delete_result_file(filepath)
         return jsonify({'success': True, 'message': 'Result deleted successfully'})
     
     except Exception as e:
@@ -273,17 +337,15 @@ def export_result_to_excel(filename):
     """Export a single diagnosis result to Google Sheet."""
     try:
         # Security: prevent directory traversal
-        if '..' in filename or '/' in filename or '\\' in filename:
+        json_filepath = _safe_result_path(filename)
+        if json_filepath is None:
             return jsonify({'error': 'Invalid filename'}), 400
         
-        json_filepath = os.path.join('results', filename)
-        
         if not os.path.exists(json_filepath):
             return jsonify({'error': 'Result not found'}), 404
         
         # Read JSON data
-        with open(json_filepath, 'r') as f:
-            result_data = json.load(f)
+        result_data = read_result_file(json_filepath)
         
         # Export to Google Sheet
         try:
@@ -306,28 +368,18 @@ def export_result_to_excel(filename):
 def export_all_results_to_excel():
     """Export all saved diagnosis results to a single Google Sheet."""
     try:
-        results_dir = 'results'
-        os.makedirs(results_dir, exist_ok=True)
-        
-        # Collect all JSON results
-        results_list = []
-        for filename in os.listdir(results_dir):
-            if filename.endswith('.json'):
-                filepath = os.path.join(results_dir, filename)
-                try:
-                    with open(filepath, 'r') as f:
-                        data = json.load(f)
-                        results_list.append(data)
-                except Exception as e:
-                    # Skip corrupted files
-                    continue
+        results_dir = RESULTS_DIR
+        
+        # List all JSON results (the index lists them without a directory scan);
+        # full results are read in batches as the export consumes them
+        rows, _, _ = query_result_summaries(results_dir)
         
-        if not results_list:
+        if not rows:
             return jsonify({'error': 'No results found to export'}), 404
         
         # Export to Google Sheet
         try:
-            sheet_url = export_bulk_results_to_gsheet(results_list)
+            sheet_url = export_bulk_results_to_gsheet(iter_indexed_results(results_dir, rows), total=len(rows))
         except FileNotFoundError:
              return jsonify({'error': 'Google Sheets authentication failed: credentials.json not found on server.'}), 500
         except Exception as e:
@@ -346,31 +398,18 @@ def export_all_results_to_excel():
 def download_full_company_list():
     """Export all company diagnosis results to Google Sheet with complete details."""
     try:
-        results_dir = 'results'
-        os.makedirs(results_dir, exist_ok=True)
-        
-        # Collect all JSON results with full data
-        results_list = []
-        for filename in os.listdir(results_dir):
-            if filename.endswith('.json'):
-                filepath = os.path.join(results_dir, filename)
-                try:
-                    stat = os.stat(filepath)
-                    with open(filepath, 'r') as f:
-                        data = json.load(f)
-                    # Add modified timestamp for date formatting
-                    data['modified'] = stat.st_mtime
-                    results_list.append(data)
-                except Exception as e:
-                    # Skip corrupted files
-                    continue
+        results_dir = RESULTS_DIR
+        
+        # List all JSON results; full data (including modified timestamps) is
+        # read in batches as the export consumes it
+        rows, _, _ = query_result_summaries(results_dir)
         
-        if not results_list:
+        if not rows:
             return jsonify({'error': 'No results found to export'}), 404
         
         # Export to Google Sheet
         try:
-            sheet_url = export_company_list_to_gsheet(results_list)
+            sheet_url = export_company_list_to_gsheet(iter_indexed_results(results_dir, rows), total=len(rows))
         except FileNotFoundError:
              return jsonify({'error': 'Google Sheets authentication failed: credentials.json not found on server.'}), 500
         except Exception as e:
@@ -396,63 +435,26 @@ def download_filtered_company_list():
         status_filter = data.get('status', '').strip()
         vulnerability_filter = data.get('vulnerability', '').strip()
         
-        results_dir = 'results'
-        os.makedirs(results_dir, exist_ok=True)
+        results_dir = RESULTS_DIR
         
-        # Collect all JSON results with full data
-        all_results = []
-        for filename in os.listdir(results_dir):
-            if filename.endswith('.json'):
-                filepath = os.path.join(results_dir, filename)
-                try:
-                    stat = os.stat(filepath)
-                    with open(filepath, 'r') as f:
-                        result_data = json.load(f)
-                    # Add modified timestamp for date formatting
-                    result_data['modified'] = stat.st_mtime
-                    all_results.append(result_data)
-                except Exception as e:
-                    # Skip corrupted files
-                    continue
+        # Apply filters against the index (same logic as /results endpoint),
+        # so only matching results are read from disk
+        rows, total_matching, _ = query_result_summaries(
+            results_dir,
+            search=search,
+            status=status_filter,
+            vulnerability=vulnerability_filter
+        )
         
-        if not all_results:
+        if not total_matching and not query_result_summaries(results_dir, limit=0)[1]:
             return jsonify({'error': 'No results found to export'}), 404
         
-        # Apply filters (same logic as /results endpoint)
-        filtered_results = []
-        
-        for result in all_results:
-            domain = result.get('domain', '').lower()
-            tech = result.get('tech', 'Unknown').lower()
-            status = result.get('status', 'unknown')
-            vulnerability_detected = result.get('vulnerability_detected', False)
-            
-            # Apply search filter
-            if search:
-                if search not in domain and search not in tech:
-                    continue
-            
-            # Apply status filter
-            if status_filter:
-                if status != status_filter:
-                    continue
-            
-            # Apply vulnerability filter
-            if vulnerability_filter == 'yes':
-                if not vulnerability_detected:
-                    continue
-            elif vulnerability_filter == 'no':
-                if vulnerability_detected:
-                    continue
-            
-            filtered_results.append(result)
-        
-        if not filtered_results:
+        if not rows:
             return jsonify({'error': 'No results match the current filters'}), 404
         
         # Export to Google Sheet
         try:
-            sheet_url = export_company_list_to_gsheet(filtered_results)
+            sheet_url = export_company_list_to_gsheet(iter_indexed_results(results_dir, rows), total=len(rows))
         except FileNotFoundError:
              return jsonify({'error': 'Google Sheets authentication failed: credentials.json not found on server.'}), 500
         except Exception as e:
@@ -510,7 +512,7 @@ def upload_csv():
         print(f"CSV upload error: {error_trace}")
         return jsonify({
             'error': f'CSV upload failed: {str(e)}',
-            'details': error_trace if os.environ.get('FLASK_DEBUG') else None
+            'details': error_trace if FLASK_DEBUG else None
         }), 500
 
 
@@ -547,7 +549,7 @@ def process_bulk_urls():
         print(f"Bulk processing error: {error_trace}")
         return jsonify({
             'error': f'Bulk processing failed: {str(e)}',
-            'details': error_trace if os.environ.get('FLASK_DEBUG') else None
+            'details': error_trace if FLASK_DEBUG else None
         }), 500
 
 
@@ -581,37 +583,62 @@ def get_bulk_status(job_id):
     
     except Exception as e:
         return jsonify({'error': f'Failed to get job status: {str(e)}'}), 500
-@app.route('/api/send-email', methods=['POST'])
-def send_personalized_email():
-    """Send a personalized email using the "Sniper" template."""
-    try:
-        data = request.get_json()
-        
-        # Required fields
-        recipient_email = data.get('recipient_email')
-        name = data.get('name', 'there')
-        domain = data.get('domain')
-        industry = data.get('industry', 'your')
-        console_errors = data.get('console_errors', '0')
-        load_time = data.get('load_time', 'N/A')
-        signature = data.get('signature', 'The Team')
-        
-        if not recipient_email or not domain:
-            return jsonify({'error': 'recipient_email and domain are required'}), 400
-            
-        # Format the template
-        subject = f"Technical debt on {domain} (AngularJS 1.x)"
-        body = f"""Hi {name},
 
-My automated scanner flagged {domain} while analyzing legacy frameworks in the {industry} sector.
 
-It looks like you're still running AngularJS 1.5 in production. We also caught [{console_errors}] console errors on the homepage that are likely impacting your load times ([{load_time}]).
+# "Sniper" outreach email, parsed once at import
+SNIPER_SUBJECT_TEMPLATE = Template("Technical debt on $domain (AngularJS 1.x)")
+SNIPER_BODY_TEMPLATE = Template("""Hi $name,
+
+My automated scanner flagged $domain while analyzing legacy frameworks in the $industry sector.
+
+It looks like you're still running AngularJS 1.5 in production. We also caught [$console_errors] console errors on the homepage that are likely impacting your load times ([$load_time]).
 
 I’m not trying to sell you a new website. But if you need a specialized team to handle the migration to React/Vue without breaking your database connections, that is exactly what we do.
 
 Open to a 10-min technical audit?
 
-{signature}"""
+$signature""")
+
+
+def _render_sniper_email(data):
+    """
+    Build (recipient_email, subject, body) for the "Sniper" template.
+    Raises ValueError when recipient_email or domain is missing.
+    """
+    recipient_email = data.get('recipient_email')
+    name = data.get('name', 'there')
+    domain = data.get('domain')
+    industry = data.get('industry', 'your')
+    console_errors = data.get('console_errors', '0')
+    load_time = data.get('load_time', 'N/A')
+    signature = data.get('signature', 'The Team')
+    
+    if not recipient_email or not domain:
+        raise ValueError('recipient_email and domain are required')
+    
+    # Format the template
+    subject = SNIPER_SUBJECT_TEMPLATE.substitute(domain=domain)
+    body = SNIPER_BODY_TEMPLATE.substitute(
+        name=name,
+        domain=domain,
+        industry=industry,
+        console_errors=console_errors,
+        load_time=load_time,
+        signature=signature
+    )
+    return recipient_email, subject, body
+
+
+@app.route('/api/send-email', methods=['POST'])
+def send_personalized_email():
+    """Send a personalized email using the "Sniper" template."""
+    try:
+        data = request.get_json()
+        
+        try:
+            recipient_email, subject, body = _render_sniper_email(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
 
         # Send the email
         send_email(recipient_email, subject, body)
@@ -624,10 +651,53 @@ Open to a 10-min technical audit?
         print(f"Send email error: {error_trace}")
         return jsonify({
             'error': f'Failed to send email: {str(e)}',
-            'details': error_trace if os.environ.get('FLASK_DEBUG') else None
+            'details': error_trace if FLASK_DEBUG else None
+        }), 500
+
+
+@app.route('/api/send-email/bulk', methods=['POST'])
+def send_bulk_personalized_emails():
+    """Send "Sniper" emails to several recipients over one SMTP connection."""
+    try:
+        data = request.get_json() or {}
+        recipients = data.get('emails', [])
+        
+        if not recipients:
+            return jsonify({'error': 'No emails provided'}), 400
+        
+        if not isinstance(recipients, list):
+            return jsonify({'error': 'emails must be a list'}), 400
+        
+        if len(recipients) > 100:  # Limit to prevent abuse
+            return jsonify({'error': 'Maximum 100 emails allowed per request'}), 400
+        
+        # Validate everything before sending anything
+        try:
+            emails = [_render_sniper_email(recipient) for recipient in recipients]
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        results = send_bulk_emails(emails)
+        failed = [{'recipient_email': email, 'error': error} for email, error in results if error]
+        
+        return jsonify({
+            'success': not failed,
+            'sent': len(results) - len(failed),
+            'failed': failed
+        })
+    
+    except Exception as e:
+        import traceback
+        error_trace = traceback.format_exc()
+        print(f"Bulk send email error: {error_trace}")
+        return jsonify({
+            'error': f'Failed to send emails: {str(e)}',
+            'details': error_trace if FLASK_DEBUG else None
         }), 500
 
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    # Each request gets its own thread so a long /diagnose does not block
+    # /results polling or the bulk-status endpoint.
+    app.run(debug=True, host='0.0.0.0', port=5000, threaded=True)
 
@@ -4,12 +4,15 @@ Handles background processing of multiple URLs with progress tracking.
 """
 import threading
 import time
-import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, List, Optional
-from urllib.parse import urlparse
-from diagnose_website import diagnose_site, generate_technical_observation
+from diagnose_website import diagnose_site, drain_with_shared_browser, generate_technical_observation
+from results_store import RESULTS_DIR, get_safe_filename, write_result_file
+
+# URLs diagnosed at once within a job (each worker runs one headless browser)
+BULK_CONCURRENCY = int(os.environ.get('BULK_CONCURRENCY', 4))
 
 
 class BulkProcessor:
@@ -56,7 +59,7 @@ class BulkProcessor:
         return job_id
     
     def _process_job(self, job_id: str):
-        """Process URLs in a job sequentially."""
+        """Process URLs in a job, up to BULK_CONCURRENCY at a time."""
         with self.lock:
             if job_id not in self.jobs:
                 return
@@ -66,74 +69,28 @@ class BulkProcessor:
         urls = job['urls']
         generate_observations = job.get('generate_observations', False)
         
-        for idx, url in enumerate(urls, 1):
-            try:
-                # Update current URL being processed
-                with self.lock:
-                    job['current_url'] = url
-                    job['completed'] = idx - 1
-                
-                print(f"[Job {job_id}] Processing {idx}/{len(urls)}: {url}")
-                
-                # Run diagnosis
-                result = diagnose_site(url)
-                
-                # Generate technical observation if requested and vulnerabilities detected
-                if generate_observations and result.get("vulnerability_detected", False):
-                    try:
-                        observation = generate_technical_observation(result)
-                        if observation:
-                            result["technical_observation"] = observation
-                    except Exception as e:
-                        print(f"Observation generation failed for {url}: {str(e)}")
-                
-                # Save to file
-                parsed = urlparse(url)
-                domain = parsed.netloc or parsed.path.split('/')[0]
-                domain = domain.replace('www.', '').replace('.', '_').replace('/', '_').replace(':', '_')
-                domain = ''.join(c if c.isalnum() or c in ('_', '-') else '_' for c in domain)
-                domain = domain[:50]
-                filename = f"diagnosis_{domain}.json"
-                filepath = os.path.join('results', filename)
-                os.makedirs('results', exist_ok=True)
-                
-                try:
-                    with open(filepath, 'w') as f:
-                        json.dump(result, f, indent=2)
-                    result['output_file'] = filename
-                    result['saved'] = True
-                except Exception as e:
-                    print(f"Failed to save result for {url}: {str(e)}")
-                    result['saved'] = False
-                    result['save_error'] = str(e)
-                
-                # Add to results
-                with self.lock:
-                    job['results'].append({
-                        'url': url,
-                        'status': 'success',
-                        'result': result
-                    })
-                    job['successful'] += 1
-                    job['completed'] = idx
-                
-            except Exception as e:
-                # Handle error gracefully - continue with next URL
-                error_msg = str(e)
-                print(f"[Job {job_id}] Error processing {url}: {error_msg}")
-                
-                with self.lock:
-                    job['results'].append({
-                        'url': url,
-                        'status': 'error',
-                        'error': error_msg
-                    })
-                    job['failed'] += 1
-                    job['completed'] = idx
-                    job['errors'].append({
-                        'url': url,
-                        'error': error_msg
-                    })
+        pending = iter(enumerate(urls, 1))
+        pending_lock = threading.Lock()
+        
+        def take():
+            with pending_lock:
+                return next(pending, None)
+        
+        def process(item, browser):
+            idx, url = item
+            self._process_url(job_id, job, idx, url, generate_observations, browser)
+        
+        def worker():
+            # One browser per worker thread, reused for every URL it takes
+            # and relaunched if it crashes or disconnects
+            drain_with_shared_browser(take, process)
+        
+        # Diagnoses are dominated by page loads, so overlapping them cuts a
+        # job's wall time roughly by the worker count
+        workers = max(1, min(BULK_CONCURRENCY, len(urls)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for _ in range(workers):
+                executor.submit(worker)
         
         # Mark job as completed
         with self.lock:
@@ -143,6 +100,68 @@ class BulkProcessor:
         
         print(f"[Job {job_id}] Completed: {job['successful']} successful, {job['failed']} failed")
     
+    def _process_url(self, job_id: str, job: Dict, idx: int, url: str, generate_observations: bool, browser=None):
+        """Diagnose, save and record a single URL of a job, reusing browser if given."""
+        try:
+            # Update current URL being processed
+            with self.lock:
+                job['current_url'] = url
+            
+            print(f"[Job {job_id}] Processing {idx}/{job['total']}: {url}")
+            
+            # Run diagnosis
+            result = diagnose_site(url, browser)
+            
+            # Generate technical observation if requested and vulnerabilities detected
+            if generate_observations and result.get("vulnerability_detected", False):
+                try:
+                    observation = generate_technical_observation(result)
+                    if observation:
+                        result["technical_observation"] = observation
+                except Exception as e:
+                    print(f"Observation generation failed for {url}: {str(e)}")
+            
+            # Save to file
+            filename = get_safe_filename(url)
+            filepath = os.path.join(RESULTS_DIR, filename)
+            
+            try:
+                write_result_file(filepath, result)
+                result['output_file'] = filename
+                result['saved'] = True
+            except Exception as e:
+                print(f"Failed to save result for {url}: {str(e)}")
+                result['saved'] = False
+                result['save_error'] = str(e)
+            
+            # Add to results
+            with self.lock:
+                job['results'].append({
+                    'url': url,
+                    'status': 'success',
+                    'result': result
+                })
+                job['successful'] += 1
+                job['completed'] += 1
+            
+        except Exception as e:
+            # Handle error gracefully - continue with next URL
+            error_msg = str(e)
+            print(f"[Job {job_id}] Error processing {url}: {error_msg}")
+            
+            with self.lock:
+                job['results'].append({
+                    'url': url,
+                    'status': 'error',
+                    'error': error_msg
+                })
+                job['failed'] += 1
+                job['completed'] += 1
+                job['errors'].append({
+                    'url': url,
+                    'error': error_msg
+                })
+    
     def get_job_status(self, job_id: str) -> Optional[Dict]:
         """
         Get current status of a job.
@@ -2,9 +2,42 @@ import re
 import json
 import sys
 import os
+import time
+import orjson
+import atexit
+import queue
+import logging
+import itertools
+import functools
+import hashlib
+import threading
+import multiprocessing
+from logging.handlers import QueueHandler, QueueListener
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import closing, contextmanager
 from urllib.parse import urlparse
 from playwright.sync_api import sync_playwright, TimeoutError
-import time
+
+# Progress lines from concurrent diagnoses are queued and written to stdout by
+# a single listener thread, so worker threads never block on console writes
+LOG_QUEUE = queue.Queue()
+log = logging.getLogger("diagnose_website")
+log.setLevel(logging.INFO)
+log.propagate = False
+log.addHandler(QueueHandler(LOG_QUEUE))
+_log_handler = logging.StreamHandler(sys.stdout)
+_log_handler.setFormatter(logging.Formatter("[%(levelname)s] %(message)s"))
+_log_listener = QueueListener(LOG_QUEUE, _log_handler)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+
+def flush_log():
+    """Block until every queued log line has been written."""
+    LOG_QUEUE.join()
+
 
 # LangChain and Groq imports
 try:
@@ -13,11 +46,22 @@ try:
     LANGCHAIN_AVAILABLE = True
 except ImportError:
     LANGCHAIN_AVAILABLE = False
-    print("[WARN] LangChain/Groq not available. Install with: pip install langchain-groq")
+    log.warning("LangChain/Groq not available. Install with: pip install langchain-groq")
+
+# RE2 checks which vulnerability patterns occur in a page in linear time
+try:
+    import re2
+    RE2_AVAILABLE = True
+except ImportError:
+    RE2_AVAILABLE = False
+
+# Everything scanned for is ASCII (library names, URLs, version digits), so the
+# regexes skip Unicode case folding and Unicode \d/\s/\b classes
+PATTERN_FLAGS = re.IGNORECASE | re.ASCII
 
 # Vulnerable patterns to check for in the source code
 # These patterns check for vulnerable versions in script tags, URLs, and source code
-VULNERABLE_PATTERNS = {
+VULNERABLE_PATTERN_SOURCES = {
     # Next.js < 13
     "nextjs_old": r"(?:_next/static/|next\.js[^/]*?@?)(1\.[0-9]\.|^1[0-2]\.)",
     
@@ -105,6 +149,136 @@ VULNERABLE_PATTERNS = {
     "modernizr_old": r"modernizr(?:-|\.min)?\.js[^/]*?(?:0\.|1\.|2\.)",
 }
 
+# Compiled once at import so page scans don't re-parse patterns per call
+VULNERABLE_PATTERNS = {
+    name: re.compile(pattern, PATTERN_FLAGS)
+    for name, pattern in VULNERABLE_PATTERN_SOURCES.items()
+}
+
+@functools.cache
+def combined_vuln_re():
+    """
+    Zero-width alternation of every vulnerability pattern, so a single pass over
+    the page finds each offset where at least one pattern starts matching.
+    Compiled on first use (it is not needed at all when RE2 is available).
+    """
+    return re.compile(
+        "(?=" + "|".join(f"(?:{pattern})" for pattern in VULNERABLE_PATTERN_SOURCES.values()) + ")",
+        PATTERN_FLAGS
+    )
+
+
+def build_re2_pattern_set(patterns):
+    """
+    Compile patterns into one case-insensitive RE2 set.
+    
+    Args:
+        patterns: Iterable of regex source strings
+    
+    Returns:
+        Compiled re2 SearchSet (indices follow the order of patterns),
+        or None when RE2 is unavailable or rejects a pattern
+    """
+    if not RE2_AVAILABLE:
+        return None
+    try:
+        options = re2.Options()
+        options.case_sensitive = False
+        pattern_set = re2.Set.SearchSet(options)
+        for pattern in patterns:
+            pattern_set.Add(pattern)
+        pattern_set.Compile()
+        return pattern_set
+    except Exception as e:
+        log.warning(f"Could not build RE2 pattern set, using re only: {e}")
+        return None
+
+
+@functools.cache
+def get_vuln_pattern_set():
+    """
+    Compile all vulnerability patterns into one RE2 set, on first use.
+    
+    Returns:
+        Compiled re2 SearchSet (indices follow VULNERABLE_PATTERN_SOURCES order),
+        or None when RE2 is unavailable or rejects a pattern
+    """
+    return build_re2_pattern_set(VULNERABLE_PATTERN_SOURCES.values())
+
+
+# Literal every match of a vulnerability pattern contains (lowercase); a pattern
+# is only scanned for when its keyword occurs somewhere in the page
+VULN_PATTERN_KEYWORDS = {
+    "next": ("nextjs_old",),
+    "angular": ("angularjs_v1_5", "angularjs_v1_4", "angularjs_v1_3", "angularjs_v1_2",
+                "angularjs_v1_1", "angularjs_v1_0", "angularjs_old"),
+    "jquery": ("jquery_old", "jquery_ui_old"),
+    "bootstrap": ("bootstrap_old",),
+    "react": ("react_old",),
+    "vue": ("vue_old",),
+    "backbone": ("backbone_old",),
+    "ember": ("ember_old",),
+    "knockout": ("knockout_old",),
+    "dojo": ("dojo_old",),
+    "prototype": ("prototype_old",),
+    "mootools": ("mootools_old",),
+    "yui": ("yui_old",),
+    "ext": ("extjs_old",),
+    "underscore": ("underscore_old",),
+    "lodash": ("lodash_old",),
+    "wp-includes/": ("wordpress_old",),
+    "drupal.js": ("drupal_old",),
+    "joomla": ("joomla_old",),
+    "handlebars": ("handlebars_old",),
+    "mustache": ("mustache_old",),
+    "marionette": ("marionette_old",),
+    "require": ("requirejs_old",),
+    "socket.io": ("socketio_old",),
+    "modernizr": ("modernizr_old",),
+}
+
+
+def find_candidate_vuln_patterns(html_lower):
+    """
+    Return the names of vulnerability patterns whose keyword occurs in the page.
+    
+    Args:
+        html_lower: Lowercased page source
+    """
+    candidates = set()
+    for keyword, names in VULN_PATTERN_KEYWORDS.items():
+        if keyword in html_lower:
+            candidates.update(names)
+    return candidates
+
+
+VULN_PATTERN_NAMES = tuple(VULNERABLE_PATTERN_SOURCES)
+
+# Duplicate key family per pattern: all AngularJS patterns (and jQuery core)
+# share one key per version, CMS patterns report once, None keys by pattern
+VULN_DEDUPE_FAMILIES = {
+    name: ('angularjs' if 'angularjs' in name
+           else 'jquery' if 'jquery' in name and 'ui' not in name
+           else 'cms' if 'wordpress' in name or 'drupal' in name or 'joomla' in name
+           else None)
+    for name in VULNERABLE_PATTERN_SOURCES
+}
+
+# Order matters: check specific versions before generic patterns
+VULN_PATTERN_ORDER = tuple(sorted(VULNERABLE_PATTERNS, key=lambda name: ('old' in name, name)))
+
+# Quoted src/href/content attribute values, where library URLs and versions live
+URL_ATTRIBUTE_RE = re.compile(r'(?:src|href|content)\s*=\s*["\']([^"\']{1,500})["\']', PATTERN_FLAGS)
+
+
+def extract_url_attributes(html):
+    """Join the src/href/content attribute values of a page, one per line."""
+    return "\n".join(URL_ATTRIBUTE_RE.findall(html))
+
+
+# Version number near a vulnerable match (e.g. "1.12.4")
+VULN_VERSION_RE = re.compile(r'(\d+\.\d+(?:\.\d+)?)', re.ASCII)
+
 
 def extract_domain(url):
     """Extract domain from URL."""
@@ -119,8 +293,66 @@ def extract_domain(url):
         return url
 
 
+def find_vulnerable_matches(html_lower):
+    """
+    Scan lowercased HTML once for all vulnerability patterns.
+    
+    Patterns whose keyword is absent from the page are skipped outright.
+    With RE2, a linear-time set match then picks the patterns present and
+    only those are run. Otherwise only offsets found by combined_vuln_re() are
+    tried against the candidate patterns, each resuming after its previous
+    match. Either way each pattern yields exactly what
+    VULNERABLE_PATTERNS[name].finditer(html_lower) would.
+    
+    Returns:
+        Dict mapping pattern name to an iterable of its matches; on the RE2
+        path these are lazy, so callers that stop early skip the rest of the scan
+    """
+    matches = dict.fromkeys(VULNERABLE_PATTERNS, ())
+    
+    candidates = find_candidate_vuln_patterns(html_lower)
+    if not candidates:
+        return matches
+    
+    pattern_set = get_vuln_pattern_set()
+    if pattern_set is not None:
+        # RE2 reports which patterns occur at all; usually none or a few are scanned
+        for index in pattern_set.Match(html_lower) or ():
+            name = VULN_PATTERN_NAMES[index]
+            matches[name] = VULNERABLE_PATTERNS[name].finditer(html_lower)
+        return matches
+    
+    candidate_patterns = [(name, VULNERABLE_PATTERNS[name]) for name in candidates]
+    next_start = dict.fromkeys(candidates, 0)
+    for name in candidates:
+        matches[name] = []
+    
+    for candidate in combined_vuln_re().finditer(html_lower):
+        pos = candidate.start()
+        for name, pattern in candidate_patterns:
+            if pos < next_start[name]:
+                continue
+            match = pattern.match(html_lower, pos)
+            if match:
+                matches[name].append(match)
+                next_start[name] = match.end()
+    
+    return matches
+
+
+def precompile():
+    """
+    Build the lazily compiled vulnerability and technology scanners up front,
+    so batch callers pay for them once before their first site rather than
+    inside it.
+    """
+    if get_vuln_pattern_set() is None:
+        combined_vuln_re()
+    get_tech_pattern_set()
+
+
 # Technology detection patterns (broader than vulnerability patterns)
-TECH_DETECTION_PATTERNS = {
+TECH_DETECTION_PATTERN_SOURCES = {
     "angularjs": r"angular(?:js|\.js|\.min\.js)",
     "angular": r"@angular/|angular\.js|angularjs",
     "react": r"react(?:\.js|\.min\.js|/)|react-dom",
@@ -163,15 +395,40 @@ TECH_DETECTION_PATTERNS = {
     "modernizr": r"modernizr(?:\.min)?\.js",
 }
 
+TECH_DETECTION_PATTERNS = {
+    name: re.compile(pattern, PATTERN_FLAGS)
+    for name, pattern in TECH_DETECTION_PATTERN_SOURCES.items()
+}
 
+TECH_PATTERN_NAMES = tuple(TECH_DETECTION_PATTERN_SOURCES)
 
-def detect_technologies_via_browser(page):
+# Patterns with an unbounded gap (e.g. "ruby.*on.*rails") can match across
+# any distance within a line, so block scans must not cut them short
+UNBOUNDED_TECH_PATTERNS = frozenset(
+    name for name, pattern in TECH_DETECTION_PATTERN_SOURCES.items()
+    if '.*' in pattern or '.+' in pattern
+)
+
+
+@functools.cache
+def get_tech_pattern_set():
     """
-    Detect technologies by injecting JavaScript into the page
-    to check global variables and DOM attributes.
-    This is much more accurate for version detection.
+    Compile all tech detection patterns into one RE2 set, on first use.
+    
+    Returns:
+        Compiled re2 SearchSet (indices follow TECH_DETECTION_PATTERN_SOURCES
+        order), or None when RE2 is unavailable or rejects a pattern
     """
-    return page.evaluate("""() => {
+    return build_re2_pattern_set(TECH_DETECTION_PATTERN_SOURCES.values())
+
+
+# Version number close to a detected tech name (e.g. "v1.2" or "-3.4.1")
+TECH_VERSION_RE = re.compile(r'[v\s\/-](\d+\.\d+(?:\.\d+)?)', PATTERN_FLAGS)
+
+
+
+# Browser-side tech detection: checks global variables and DOM attributes
+DETECT_TECHS_FUNCTION = """() => {
         const techs = [];
         const seen = new Set();
         
@@ -312,74 +569,248 @@ def detect_technologies_via_browser(page):
             
             // Script SRC scanning
             // Look for patterns like /jquery-3.6.0.min.js
-            const scripts = document.querySelectorAll('script[src]');
-            scripts.forEach(script => {
-                const src = script.src;
-                // Regex to capture filename and version
-                // Matches: jquery-3.6.0.min.js, app.v1.2.3.js, etc.
-                const match = src.match(/([a-zA-Z0-9-]+)[.-](\d+\.\d+(?:\.\d+)?)/);
-                if (match) {
-                    let name = match[1].toLowerCase();
-                    const version = match[2];
-                    
-                    // Normalize common library names from filenames
-                    if (name.includes('jquery') && !name.includes('ui')) name = 'jquery';
-                    else if (name.includes('bootstrap')) name = 'bootstrap';
-                    else if (name.includes('vue')) name = 'vue';
-                    else if (name.includes('react')) name = 'react';
-                    else if (name.includes('angular')) name = 'angular';
-                    
-                    if (['jquery', 'bootstrap', 'vue', 'react', 'angular', 'angularjs', 'moment', 'lodash', 'underscore', 'backbone', 'knockout'].includes(name)) {
-                        add(name, version, 'medium');
-                    }
+            // All srcs are scanned as one string with a single regex; the lazy
+            // ^[^\\n]*? prefix keeps just the first match in each script's src
+            // Matches: jquery-3.6.0.min.js, app.v1.2.3.js, etc.
+            const srcs = Array.from(document.querySelectorAll('script[src]'), script => script.src).join('\\n');
+            const libraryNames = ['bootstrap', 'vue', 'react', 'angular'];
+            const knownLibraries = new Set(['jquery', 'bootstrap', 'vue', 'react', 'angular', 'angularjs', 'moment', 'lodash', 'underscore', 'backbone', 'knockout']);
+            for (const match of srcs.matchAll(/^[^\\n]*?([a-zA-Z0-9-]+)[.-](\\d+\\.\\d+(?:\\.\\d+)?)/gm)) {
+                let name = match[1].toLowerCase();
+                const version = match[2];
+                
+                // Normalize common library names from filenames
+                if (name.includes('jquery') && !name.includes('ui')) name = 'jquery';
+                else name = libraryNames.find(library => name.includes(library)) || name;
+                
+                if (knownLibraries.has(name)) {
+                    add(name, version, 'medium');
                 }
-            });
+            }
 
         } catch (e) {
             // console.log('Tech detection error', e);
         }
         
         return techs;
-    }""")
+    }"""
+
+# Installed once per browser context with add_init_script(), so V8 parses the
+# detection code once and each page only needs a short evaluate() call
+DETECT_TECHS_INIT_SCRIPT = "window.__detectTechs = " + DETECT_TECHS_FUNCTION + ";"
+
+
+# Resolves to First Contentful Paint in ms, waiting up to 5 seconds for it
+MEASURE_FCP_FUNCTION = """() => {
+    return new Promise((resolve) => {
+        // Check if FCP is already available
+        const entries = performance.getEntriesByType('paint');
+        const fcpEntry = entries.find(entry => entry.name === 'first-contentful-paint');
+        
+        if (fcpEntry) {
+            resolve(Math.round(fcpEntry.startTime));
+        } else {
+            // Wait for FCP if not available yet
+            const observer = new PerformanceObserver((list) => {
+                const entries = list.getEntries();
+                const fcpEntry = entries.find(entry => entry.name === 'first-contentful-paint');
+                if (fcpEntry) {
+                    observer.disconnect();
+                    resolve(Math.round(fcpEntry.startTime));
+                }
+            });
+            
+            try {
+                observer.observe({ entryTypes: ['paint'] });
+                // Timeout after 5 seconds
+                setTimeout(() => {
+                    observer.disconnect();
+                    resolve(null);
+                }, 5000);
+            } catch (e) {
+                resolve(null);
+            }
+        }
+    });
+}"""
+
+# Browser-detected techs, page HTML and FCP in one evaluate() call; techs is
+# null when the page's context was set up without DETECT_TECHS_INIT_SCRIPT
+PAGE_SNAPSHOT_SCRIPT = """async () => {
+    const techs = window.__detectTechs ? window.__detectTechs() : null;
+    const html = document.documentElement ? document.documentElement.outerHTML : '';
+    const fcp = await (""" + MEASURE_FCP_FUNCTION + """)();
+    return {techs, html, fcp};
+}"""
+
+
+def detect_technologies_via_browser(page):
+    """
+    Detect technologies by injecting JavaScript into the page
+    to check global variables and DOM attributes.
+    This is much more accurate for version detection.
+    
+    Pages from a context set up with DETECT_TECHS_INIT_SCRIPT only need a
+    tiny call; other pages get the full detection script sent over.
+    """
+    techs = page.evaluate("() => window.__detectTechs ? window.__detectTechs() : null")
+    if techs is None:
+        techs = page.evaluate(DETECT_TECHS_FUNCTION)
+    return techs
+
+
+def get_page_html(page):
+    """
+    Serialize the page's DOM with a single evaluate() call.
+    Returns the root element's outerHTML (no doctype), which is all the scanners need.
+    """
+    return page.evaluate("() => document.documentElement ? document.documentElement.outerHTML : ''")
+
+
+# Large pages are scanned block by block, running every pattern over one block
+# before moving on so it stays in cache; a match may start in a block and run
+# up to STATIC_SCAN_OVERLAP chars past its end (UNBOUNDED_TECH_PATTERNS may
+# run to the end of the page)
+STATIC_SCAN_BLOCK = 256 * 1024
+STATIC_SCAN_OVERLAP = 1024
+
+
+# Static detection results kept for recently seen pages, keyed by a digest
+# of the HTML (retries and re-runs of a domain usually serve the same page)
+STATIC_TECH_CACHE_SIZE = 4096
+_static_tech_cache = OrderedDict()
+_static_tech_cache_lock = threading.Lock()
+
+
+# Worker processes for static detection of large pages: the regex sweep holds
+# the GIL, so run in-process it stalls the other diagnose threads. Defaults to
+# 0 (scan in-process), since each spawned worker costs a full interpreter in
+# the web server; the command-line batch opts in with one per spare core
+STATIC_DETECTION_PROCESSES = int(os.environ.get('STATIC_DETECTION_PROCESSES', 0))
+
+# Pages smaller than this are scanned in-process; shipping them to a worker
+# costs more than the scan
+STATIC_DETECTION_POOL_MIN_SIZE = 512 * 1024
+
+
+@functools.cache
+def get_static_detection_pool():
+    """
+    Start the static detection process pool on first use.
+    
+    Workers are spawned rather than forked, since the parent runs browser
+    threads. Returns None when STATIC_DETECTION_PROCESSES is 0.
+    """
+    if STATIC_DETECTION_PROCESSES <= 0:
+        return None
+    return ProcessPoolExecutor(
+        max_workers=STATIC_DETECTION_PROCESSES,
+        mp_context=multiprocessing.get_context('spawn')
+    )
+
+
+def clear_tech_cache():
+    """Drop all cached static detection results."""
+    with _static_tech_cache_lock:
+        _static_tech_cache.clear()
 
 
 def detect_technologies_static(html_content):
     """
     Detect technologies from HTML content using regex.
     Improved to look for versions in context rather than globally.
+    
+    Results are cached by a blake2b digest of the HTML, so an identical page
+    is only scanned once (see clear_tech_cache()). Large pages are scanned in
+    the static detection process pool when it is enabled.
     """
-    html_lower = html_content.lower()
-    detected_techs = []
+    key = hashlib.blake2b(html_content.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+    with _static_tech_cache_lock:
+        techs = _static_tech_cache.get(key)
+        if techs is not None:
+            _static_tech_cache.move_to_end(key)
     
-    for tech_name, pattern in TECH_DETECTION_PATTERNS.items():
-        # Find all matches of the tech pattern
-        for match in re.finditer(pattern, html_lower, re.IGNORECASE):
-            # Extract a window of text around the match to look for a version number
-            # Look ahead ~30 chars and behind ~10 chars
-            start_pos = match.start()
-            end_pos = min(len(html_lower), match.end() + 30)
-            
-            context = html_lower[start_pos:end_pos]
-            
-            # Look for version pattern like "1.2.3" or "v1.2" inside this context
-            # We want to be reasonably close to the tech name
-            version_match = re.search(r'[v\s\/-](\d+\.\d+(?:\.\d+)?)', context)
-            
-            version = None
-            if version_match:
-                version = version_match.group(1)
+    if techs is None:
+        pool = None
+        if len(html_content) >= STATIC_DETECTION_POOL_MIN_SIZE:
+            pool = get_static_detection_pool()
+        if pool is not None:
+            try:
+                techs = tuple(pool.submit(_scan_technologies_static, html_content).result())
+            except BrokenProcessPool as e:
+                log.warning(f"Static detection pool failed, scanning in-process: {e}")
+        if techs is None:
+            techs = tuple(_scan_technologies_static(html_content))
+        with _static_tech_cache_lock:
+            _static_tech_cache[key] = techs
+            if len(_static_tech_cache) > STATIC_TECH_CACHE_SIZE:
+                _static_tech_cache.popitem(last=False)
+    
+    # Copies, so callers can't alter the cached entries
+    return [dict(tech) for tech in techs]
+
+
+def _scan_technologies_static(html_content):
+    """
+    Run the regex sweep behind detect_technologies_static().
+    
+    With RE2, one linear set match over the page first picks the techs that
+    occur at all, and only their patterns are swept (most pages contain a
+    handful of the ~40 techs, and an absent one costs a full scan).
+    """
+    patterns = TECH_DETECTION_PATTERNS
+    pattern_set = get_tech_pattern_set()
+    if pattern_set is not None:
+        present = sorted(pattern_set.Match(html_content) or ())
+        patterns = {TECH_PATTERN_NAMES[index]: TECH_DETECTION_PATTERNS[TECH_PATTERN_NAMES[index]]
+                    for index in present}
+    
+    # Patterns are case-insensitive, so no lowercased copy of the page is needed
+    found = {tech_name: [] for tech_name in patterns}
+    # Where each pattern resumes; None once a versioned instance was found
+    next_start = dict.fromkeys(patterns, 0)
+    
+    for block_start in range(0, len(html_content), STATIC_SCAN_BLOCK):
+        block_end = block_start + STATIC_SCAN_BLOCK
+        
+        for tech_name, pattern in patterns.items():
+            pos = next_start[tech_name]
+            if pos is None or pos >= block_end:
+                continue
             
-            # If we found it, add it
-            detected_techs.append({
-                "name": tech_name,
-                "version": version,
-                "confidence": "low"  # Static analysis is always lower confidence than runtime
-            })
+            # Find all matches of the tech pattern that start in this block
+            if tech_name in UNBOUNDED_TECH_PATTERNS:
+                scan_end = len(html_content)
+            else:
+                scan_end = block_end + STATIC_SCAN_OVERLAP
+            for match in pattern.finditer(html_content, pos, scan_end):
+                if match.start() >= block_end:
+                    break
+                next_start[tech_name] = match.end()
+                
+                # Look for version pattern like "1.2.3" or "v1.2" in the ~30 chars
+                # after the match; we want to be reasonably close to the tech name
+                version_match = TECH_VERSION_RE.search(html_content, match.start(), match.end() + 30)
+                
+                version = None
+                if version_match:
+                    version = version_match.group(1)
+                
+                # If we found it, add it
+                found[tech_name].append({
+                    "name": tech_name,
+                    "version": version,
+                    "confidence": "low"  # Static analysis is always lower confidence than runtime
+                })
+                
+                if version:
+                    next_start[tech_name] = None # If we found a versioned instance, likely good enough for this tech
+                    break
             
-            if version:
-                break # If we found a versioned instance, likely good enough for this tech
+            if next_start[tech_name] is not None and next_start[tech_name] < block_end:
+                next_start[tech_name] = block_end
     
-    return detected_techs
+    return [tech for techs in found.values() for tech in techs]
 
 
 def merge_detected_techs(browser_techs, static_techs):
@@ -389,19 +820,8 @@ def merge_detected_techs(browser_techs, static_techs):
     """
     merged = {}
     
-    # Process browser techs first (higher priority)
-    for tech in browser_techs:
-        name = tech['name']
-        version = tech['version']
-        
-        if name not in merged:
-            merged[name] = version
-        elif version and not merged[name]:
-            # Upgrade to versioned if we only had unversioned
-            merged[name] = version
-            
-    # Process static techs (fallback)
-    for tech in static_techs:
+    # Browser techs come first (higher priority), static techs are the fallback
+    for tech in itertools.chain(browser_techs, static_techs):
         name = tech['name']
         version = tech['version']
         
@@ -411,75 +831,90 @@ def merge_detected_techs(browser_techs, static_techs):
             # Upgrade to versioned if we only had unversioned
             merged[name] = version
             
-    # Convert back to list format
-    result = []
-    for name, version in merged.items():
-        result.append({"name": name, "version": version})
-        
-    return result
+    return [{"name": name, "version": version} for name, version in merged.items()]
+
+
+# Map tech types to readable names
+TECH_DISPLAY_NAMES = {
+    "angularjs": "AngularJS",
+    "angular": "Angular",
+    "jquery": "jQuery",
+    "bootstrap": "Bootstrap",
+    "react": "React",
+    "vue": "Vue.js",
+    "nextjs": "Next.js",
+    "nuxt": "Nuxt.js",
+    "svelte": "Svelte",
+    "backbone": "Backbone.js",
+    "ember": "Ember.js",
+    "knockout": "Knockout.js",
+    "dojo": "Dojo Toolkit",
+    "prototype": "Prototype.js",
+    "mootools": "MooTools",
+    "yui": "YUI",
+    "extjs": "ExtJS",
+    "underscore": "Underscore.js",
+    "lodash": "Lodash",
+    "moment": "Moment.js",
+    "jquery_ui": "jQuery UI",
+    "wordpress": "WordPress",
+    "drupal": "Drupal",
+    "joomla": "Joomla",
+    "magento": "Magento",
+    "shopify": "Shopify",
+    "woocommerce": "WooCommerce",
+    "aspnet": "ASP.NET",
+    "php": "PHP",
+    "rails": "Ruby on Rails",
+    "django": "Django",
+    "laravel": "Laravel",
+    "handlebars": "Handlebars",
+    "mustache": "Mustache.js",
+    "marionette": "Marionette.js",
+    "requirejs": "RequireJS",
+    "socketio": "Socket.io",
+    "express": "Express.js",
+    "fontawesome": "Font Awesome",
+    "modernizr": "Modernizr",
+    # Only reported by the browser detector (meta generator tags)
+    "wix": "Wix",
+    "squarespace": "Squarespace",
+}
+
+
+def vuln_display_name(vuln_type):
+    """Readable tech name for a vulnerability type, using the longest matching key."""
+    keys = [key for key in TECH_DISPLAY_NAMES if vuln_type.startswith(key)]
+    return TECH_DISPLAY_NAMES[max(keys, key=len)] if keys else "Unknown"
+
+
+# Vulnerability type -> readable name (e.g. "jquery_ui_old" -> "jQuery UI")
+VULN_TYPE_DISPLAY_NAMES = {
+    vuln_type: vuln_display_name(vuln_type) for vuln_type in VULNERABLE_PATTERN_SOURCES
+}
+
+
+# Prioritize frameworks over libraries but showing multiple is good
+TECH_PRIORITY_ORDER = ("nextjs", "nuxt", "react", "vue", "angular", "angularjs", "svelte", 
+                       "wordpress", "drupal", "joomla", "magento", "shopify", "rails", 
+                       "django", "laravel", "aspnet", "php", "express", "ember", "backbone", 
+                       "bootstrap", "jquery") # added bootstrap/jquery to end of priority list to still show if relevant
+
+# Tech name -> sort score (earlier in TECH_PRIORITY_ORDER scores higher)
+TECH_PRIORITY_SCORES = {
+    name: len(TECH_PRIORITY_ORDER) - index for index, name in enumerate(TECH_PRIORITY_ORDER)
+}
+
+CONFIDENCE_SCORES = {'high': 3, 'medium': 2}
 
 
 def format_tech_name(vulnerabilities, detected_techs=None):
     """Format technology name from vulnerabilities list or detected technologies."""
-    # Map tech types to readable names
-    tech_map = {
-        "angularjs": "AngularJS",
-        "angular": "Angular",
-        "jquery": "jQuery",
-        "bootstrap": "Bootstrap",
-        "react": "React",
-        "vue": "Vue.js",
-        "nextjs": "Next.js",
-        "nuxt": "Nuxt.js",
-        "svelte": "Svelte",
-        "backbone": "Backbone.js",
-        "ember": "Ember.js",
-        "knockout": "Knockout.js",
-        "dojo": "Dojo Toolkit",
-        "prototype": "Prototype.js",
-        "mootools": "MooTools",
-        "yui": "YUI",
-        "extjs": "ExtJS",
-        "underscore": "Underscore.js",
-        "lodash": "Lodash",
-        "moment": "Moment.js",
-        "jquery_ui": "jQuery UI",
-        "wordpress": "WordPress",
-        "drupal": "Drupal",
-        "joomla": "Joomla",
-        "magento": "Magento",
-        "shopify": "Shopify",
-        "woocommerce": "WooCommerce",
-        "aspnet": "ASP.NET",
-        "php": "PHP",
-        "rails": "Ruby on Rails",
-        "django": "Django",
-        "laravel": "Laravel",
-        "handlebars": "Handlebars",
-        "mustache": "Mustache.js",
-        "marionette": "Marionette.js",
-        "requirejs": "RequireJS",
-        "socketio": "Socket.io",
-        "express": "Express.js",
-        "fontawesome": "Font Awesome",
-        "modernizr": "Modernizr",
-    }
-    
     # Priority 1: Use detected technologies
     if detected_techs:
-        # Prioritize frameworks over libraries but showing multiple is good
-        priority_order = ["nextjs", "nuxt", "react", "vue", "angular", "angularjs", "svelte", 
-                        "wordpress", "drupal", "joomla", "magento", "shopify", "rails", 
-                        "django", "laravel", "aspnet", "php", "express", "ember", "backbone", 
-                        "bootstrap", "jquery"] # added bootstrap/jquery to end of priority list to still show if relevant
-        
         # Sort detected techs by confidence (high first), then by priority
         def get_sort_key(t):
-            conf_score = 3 if t.get('confidence') == 'high' else (2 if t.get('confidence') == 'medium' else 1)
-            priority_score = 0
-            if t['name'] in priority_order:
-                priority_score = len(priority_order) - priority_order.index(t['name'])
-            return (conf_score, priority_score)
+            return (CONFIDENCE_SCORES.get(t.get('confidence'), 1), TECH_PRIORITY_SCORES.get(t['name'], 0))
             
         sorted_techs = sorted(detected_techs, key=get_sort_key, reverse=True)
         
@@ -490,13 +925,16 @@ def format_tech_name(vulnerabilities, detected_techs=None):
             if len(formatted_names) >= 3:
                 break
                 
-            name = tech_map.get(tech["name"], tech["name"].title())
-            if tech["version"]:
-                name = f"{name} {tech['version']}"
+            name = TECH_DISPLAY_NAMES.get(tech["name"]) or tech["name"].title()
             
             # Avoid duplicates (e.g. React and React 16)
-            if not any(name.split()[0] in curr for curr in formatted_names):
-                formatted_names.append(name)
+            first_word = name.partition(" ")[0]
+            if any(first_word in curr for curr in formatted_names):
+                continue
+            
+            if tech["version"]:
+                name = f"{name} {tech['version']}"
+            formatted_names.append(name)
         
         if formatted_names:
             return ", ".join(formatted_names)
@@ -507,11 +945,7 @@ def format_tech_name(vulnerabilities, detected_techs=None):
         tech_type = first_vuln.get("type", "")
         version = first_vuln.get("version", "unknown")
         
-        tech_name = "Unknown"
-        for key, name in tech_map.items():
-            if key in tech_type.lower():
-                tech_name = name
-                break
+        tech_name = VULN_TYPE_DISPLAY_NAMES.get(tech_type, "Unknown")
         
         if version != "unknown":
             tech_name = f"{tech_name} {version}"
@@ -529,10 +963,93 @@ def format_load_time(fcp_ms):
     return f"{seconds:.1f}s"
 
 
-def diagnose_site(url):
+# Sites diagnose_multiple_sites() loads at once (one headless browser per worker)
+DIAGNOSE_CONCURRENCY = int(os.environ.get('DIAGNOSE_CONCURRENCY', 4))
+
+# Shared browsers a worker launches before falling back to one per URL
+MAX_BROWSER_LAUNCHES = 5
+
+
+@contextmanager
+def shared_browser():
+    """
+    Launch one headless Chromium to reuse across several diagnose_site() calls.
+    
+    Playwright's sync API is bound to the thread that started it, so each
+    thread diagnosing sites needs its own shared_browser().
+    """
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        try:
+            yield browser
+        finally:
+            browser.close()
+
+
+def drain_with_shared_browser(take, process):
+    """
+    Work through queued items on the calling thread, reusing one
+    shared_browser() for all of them.
+    
+    The browser is checked before each item; if it crashed or disconnected
+    it is closed and a new one launched for the remaining items. After
+    MAX_BROWSER_LAUNCHES launches, or if a launch fails, the rest are
+    processed with browser=None (diagnose_site() then launches one per URL).
+    
+    Args:
+        take: Callable returning the next item, or None when none are left
+            (shared between threads, so it must be thread-safe)
+        process: Callable(item, browser) handling one item; it should catch
+            its own errors
+    """
+    def drain(browser):
+        # False when the browser died before the queue was empty
+        while True:
+            if browser is not None and not browser.is_connected():
+                return False
+            item = take()
+            if item is None:
+                return True
+            process(item, browser)
+    
+    for _ in range(MAX_BROWSER_LAUNCHES):
+        try:
+            with shared_browser() as browser:
+                if drain(browser):
+                    return
+        except Exception as e:
+            log.warning(f"Shared browser unavailable: {e}")
+            break
+        log.warning("Browser disconnected, relaunching")
+    drain(None)
+
+
+def failed_diagnosis(url, error):
+    """Result for a URL whose diagnosis raised, shaped like diagnose_site()'s."""
+    return {
+        "url": url,
+        "console_errors": [],
+        "first_contentful_paint_ms": None,
+        "vulnerabilities": [],
+        "status": "error",
+        "error": str(error),
+        "domain": extract_domain(url),
+        "tech": format_tech_name([]),
+        "console_error_count": 0,
+        "load_time": format_load_time(None),
+        "vulnerability_detected": False
+    }
+
+
+def diagnose_site(url, browser=None):
     """
     Diagnose a website for console errors, load speed, and vulnerabilities.
     
+    Args:
+        url: URL to diagnose
+        browser: Browser from shared_browser() to run in; each call gets its own
+            context. When omitted a browser is launched just for this URL.
+    
     Returns a JSON object with:
     - url: The tested URL
     - console_errors: List of console error messages
@@ -540,6 +1057,10 @@ def diagnose_site(url):
     - vulnerabilities: List of detected vulnerable patterns
     - status: Overall status (clean, at_risk, timeout, error)
     """
+    if browser is None:
+        with shared_browser() as browser:
+            return diagnose_site(url, browser)
+
     result = {
         "url": url,
         "console_errors": [],
@@ -548,11 +1069,11 @@ def diagnose_site(url):
         "status": "unknown"
     }
 
-    print(f"[INFO] Starting diagnosis for {url}")
+    log.info(f"Starting diagnosis for {url}")
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context()
+    # A fresh context per URL keeps cookies and storage from leaking between sites
+    with closing(browser.new_context()) as context:
+        context.add_init_script(DETECT_TECHS_INIT_SCRIPT)
         page = context.new_page()
 
         # Capture console errors
@@ -574,29 +1095,35 @@ def diagnose_site(url):
             # Navigate - try networkidle first, fallback to domcontentloaded
             try:
                 page.goto(url, wait_until="networkidle", timeout=30000)
-                print("[INFO] Page loaded (networkidle)")
+                log.info("Page loaded (networkidle)")
             except TimeoutError:
                 # If networkidle times out, try domcontentloaded to at least get HTML
                 try:
                     page.goto(url, wait_until="domcontentloaded", timeout=30000)
-                    print("[INFO] Page loaded (domcontentloaded - partial)")
+                    log.info("Page loaded (domcontentloaded - partial)")
                 except TimeoutError:
                     # Even if timeout, try to get whatever HTML is available
-                    print("[WARN] Page load timeout, attempting to get HTML...")
+                    log.warning("Page load timeout, attempting to get HTML...")
                     pass
 
-            # 1. Detect technologies via active Browser JS injection (Most accurate)
-            try:
-                browser_techs = detect_technologies_via_browser(page)
-                print(f"[INFO] Browser-detected technologies: {[t['name'] + (' ' + t['version'] if t['version'] else '') for t in browser_techs]}")
-            except Exception as e:
-                print(f"[WARN] Browser tech detection failed: {e}")
-                browser_techs = []
+            # Browser techs, HTML and FCP come back from a single evaluate() round trip
+            # (the FCP script waits for the paint entry itself if it hasn't fired yet)
+            snapshot = page.evaluate(PAGE_SNAPSHOT_SCRIPT)
+            html = snapshot['html'] or ""
+            fcp = snapshot['fcp']
 
-            # 2. Get HTML content for static analysis and vulnerability scanning
+            # 1. Technologies detected via active Browser JS injection (Most accurate)
+            browser_techs = snapshot['techs']
+            if browser_techs is None:
+                try:
+                    browser_techs = detect_technologies_via_browser(page)
+                except Exception as e:
+                    log.warning(f"Browser tech detection failed: {e}")
+                    browser_techs = []
+            log.info(f"Browser-detected technologies: {[t['name'] + (' ' + t['version'] if t['version'] else '') for t in browser_techs]}")
+
+            # 2. Static analysis of the HTML (also reused for vulnerability scanning)
             try:
-                html = page.content()
-                
                 # Detect technologies via static HTML analysis (Fallback)
                 static_techs = detect_technologies_static(html)
                 
@@ -604,108 +1131,56 @@ def diagnose_site(url):
                 detected_techs = merge_detected_techs(browser_techs, static_techs)
                 
                 if detected_techs:
-                    print(f"[INFO] Final detected technologies: {[t['name'] + (' ' + t['version'] if t['version'] else '') for t in detected_techs[:5]]}")
+                    log.info(f"Final detected technologies: {[t['name'] + (' ' + t['version'] if t['version'] else '') for t in detected_techs[:5]]}")
             except Exception as e:
-                print(f"[WARN] Could not get HTML content: {e}")
+                log.warning(f"Static tech detection failed: {e}")
                 # Use whatever we got from browser
                 detected_techs = merge_detected_techs(browser_techs, [])
 
-            # Wait a bit for performance entries to be available
-            time.sleep(1)
-
-            # Measure First Contentful Paint (FCP)
-            fcp = page.evaluate("""
-                () => {
-                    return new Promise((resolve) => {
-                        // Check if FCP is already available
-                        const entries = performance.getEntriesByType('paint');
-                        const fcpEntry = entries.find(entry => entry.name === 'first-contentful-paint');
-                        
-                        if (fcpEntry) {
-                            resolve(Math.round(fcpEntry.startTime));
-                        } else {
-                            // Wait for FCP if not available yet
-                            const observer = new PerformanceObserver((list) => {
-                                const entries = list.getEntries();
-                                const fcpEntry = entries.find(entry => entry.name === 'first-contentful-paint');
-                                if (fcpEntry) {
-                                    observer.disconnect();
-                                    resolve(Math.round(fcpEntry.startTime));
-                                }
-                            });
-                            
-                            try {
-                                observer.observe({ entryTypes: ['paint'] });
-                                // Timeout after 5 seconds
-                                setTimeout(() => {
-                                    observer.disconnect();
-                                    resolve(null);
-                                }, 5000);
-                            } catch (e) {
-                                resolve(null);
-                            }
-                        }
-                    });
-                }
-            """)
-
             result["first_contentful_paint_ms"] = fcp
             if fcp:
-                print(f"[INFO] FCP: {fcp}ms")
+                log.info(f"FCP: {fcp}ms")
             else:
-                print("[WARN] FCP measurement unavailable")
+                log.warning("FCP measurement unavailable")
 
-            # Get page source for vulnerability scanning (if not already got)
-            if not html:
-                try:
-                    html = page.content()
-                except:
-                    html = ""
-            
-            html_lower = html.lower() if html else ""
+            # Vulnerable versions appear in script/link URLs and meta content,
+            # so only those attribute values are scanned, not the whole page
+            scan_source = extract_url_attributes(html) if html else ""
+            scan_lower = scan_source.lower()
 
             # Track found vulnerabilities to avoid duplicates
             found_vulns = set()
             
-            # Check for vulnerable patterns (check specific versions first, then generic)
-            # Order matters: check specific versions before generic patterns
-            pattern_order = sorted(VULNERABLE_PATTERNS.items(), 
-                                 key=lambda x: ('old' in x[0], x[0]))
+            # Check for vulnerable patterns in VULN_PATTERN_ORDER (specific versions first)
+            # One pass over the attribute values collects the matches of every pattern
+            vuln_matches = find_vulnerable_matches(scan_lower)
             
-            for tech, pattern in pattern_order:
-                # Use stricter regex finditer
-                matches = re.finditer(pattern, html_lower, re.IGNORECASE)
-                for match in matches:
-                    # Extract version number from the match context
-                    match_start = max(0, match.start() - 50)
-                    match_end = min(len(html_lower), match.end() + 50)
-                    context = html_lower[match_start:match_end]
-                    
-                    # Try to find version number in the context
-                    version_match = re.search(r'(\d+\.\d+(?:\.\d+)?)', context)
+            for tech in VULN_PATTERN_ORDER:
+                family = VULN_DEDUPE_FAMILIES[tech]
+                for match in vuln_matches[tech]:
+                    # Find a version number within 50 chars of the match; the regex
+                    # clamps pos/endpos to the string, so no window is sliced out
+                    version_match = VULN_VERSION_RE.search(scan_lower, match.start() - 50, match.end() + 50)
                     version = version_match.group(1) if version_match else "unknown"
                     
-                    # Create a unique key for this vulnerability
-                    # For AngularJS, use the actual version instead of pattern name
-                    if 'angularjs' in tech:
-                        vuln_key = f"angularjs_{version}"
-                    elif 'jquery' in tech and 'ui' not in tech:
+                    if family == 'jquery':
                         # Skip jQuery plugins (files that aren't jquery.js or jquery.min.js)
-                        matched_text = html[match.start():match.end()][:100].lower()
+                        matched_text = scan_lower[match.start():match.end()][:100]
                         # Only flag if it's actually jquery.js or jquery.min.js, not plugins
                         if not ('jquery.js' in matched_text or 'jquery.min.js' in matched_text or 
                                 'jquery/' in matched_text or '/jquery' in matched_text):
                             continue
-                        vuln_key = f"jquery_{version}"
-                    elif 'wordpress' in tech or 'drupal' in tech or 'joomla' in tech:
+                    
+                    # Create a unique key for this vulnerability
+                    if family == 'cms':
                         # CMS frameworks - use tech name as key
                         vuln_key = tech
-                    elif 'php' in tech or 'aspnet' in tech or 'rails' in tech or 'django' in tech:
-                        # Backend frameworks - use tech name and version
-                        vuln_key = f"{tech}_{version}" if version != "unknown" else tech
+                    elif family:
+                        # AngularJS / jQuery - use the actual version instead of pattern name
+                        vuln_key = (family, version)
                     else:
                         # Other frameworks - use tech name and version
-                        vuln_key = f"{tech}_{version}" if version != "unknown" else tech
+                        vuln_key = (tech, version)
                     
                     # Skip if we've already found this vulnerability
                     if vuln_key in found_vulns:
@@ -714,14 +1189,14 @@ def diagnose_site(url):
                     found_vulns.add(vuln_key)
                     
                     # Extract the actual matched text for reference
-                    matched_text = html[match.start():match.end()][:100]  # First 100 chars
+                    matched_text = scan_source[match.start():match.end()][:100]  # First 100 chars
                     
                     result["vulnerabilities"].append({
                         "type": tech,
                         "version": version,
                         "matched_text": matched_text
                     })
-                    print(f"[WARN] Found vulnerability: {tech} (version: {version})")
+                    log.warning(f"Found vulnerability: {tech} (version: {version})")
                     break  # Only report once per pattern type
 
             # Determine overall status
@@ -732,41 +1207,38 @@ def diagnose_site(url):
             else:
                 result["status"] = "clean"
 
-            print(f"[INFO] Status: {result['status']}")
+            log.info(f"Status: {result['status']}")
             if result["console_errors"]:
-                print(f"[INFO] Found {len(result['console_errors'])} console errors")
+                log.info(f"Found {len(result['console_errors'])} console errors")
             if result["vulnerabilities"]:
-                print(f"[INFO] Found {len(result['vulnerabilities'])} vulnerabilities")
+                log.info(f"Found {len(result['vulnerabilities'])} vulnerabilities")
 
         except TimeoutError:
-            print("[ERROR] Page load timeout")
+            log.error("Page load timeout")
             result["status"] = "timeout"
             result["error"] = "Page load timeout after 30 seconds"
             # Try to get HTML even on timeout for tech detection
             try:
-                html = page.content()
+                html = html or get_page_html(page)
                 static_techs = detect_technologies_static(html)
                 detected_techs = merge_detected_techs([], static_techs)
                 if detected_techs:
-                    print(f"[INFO] Detected technologies (timeout): {[t['name'] for t in detected_techs[:3]]}")
+                    log.info(f"Detected technologies (timeout): {[t['name'] for t in detected_techs[:3]]}")
             except:
                 pass
 
         except Exception as e:
-            print(f"[ERROR] Unexpected error: {e}")
+            log.error(f"Unexpected error: {e}")
             result["status"] = "error"
             result["error"] = str(e)
             # Try to get HTML even on error for tech detection
             try:
-                html = page.content()
+                html = html or get_page_html(page)
                 static_techs = detect_technologies_static(html)
                 detected_techs = merge_detected_techs([], static_techs)
             except:
                 pass
 
-        finally:
-            browser.close()
-
     # Add new fields to result
     result["domain"] = extract_domain(url)
     result["tech"] = format_tech_name(result["vulnerabilities"], detected_techs)
@@ -777,6 +1249,57 @@ def diagnose_site(url):
     return result
 
 
+# Groq model used for technical observations (llama-3.1-8b-instant is several
+# times faster if its shorter observations are good enough)
+GROQ_MODEL = os.environ.get('GROQ_MODEL', 'llama-3.3-70b-versatile')
+
+
+@functools.cache
+def get_groq_llm(groq_api_key):
+    """
+    Create the Groq chat model once per API key, so its HTTP client and
+    connection pool are reused across observation requests.
+    """
+    return ChatGroq(
+        groq_api_key=groq_api_key,
+        model_name=GROQ_MODEL,
+        temperature=0.3
+    )
+
+
+@functools.cache
+def get_observation_chain(groq_api_key):
+    """Build the prompt | llm chain for a single site's observation, once."""
+    # Create the prompt template with exact system prompt as specified
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", """You are a Senior Technical Architect. You are analyzing a prospective client's website.
+
+They are running {tech} which is End-of-Life.
+
+They have {error_count} console errors and a load time of {load_time}.
+
+Write a specific, 2-sentence 'Technical Observation' about why this is dangerous for their business (focus on security or lost revenue). Do NOT be salesy. Be clinical."""),
+        ("human", "Generate the technical observation.")
+    ])
+    return prompt | get_groq_llm(groq_api_key)
+
+
+@functools.cache
+def get_batch_observation_chain(groq_api_key):
+    """Build the prompt | llm chain that covers a batch of sites per request, once."""
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", """You are a Senior Technical Architect. You are analyzing prospective clients' websites.
+
+For each site in the JSON list below: they are running `tech` which is End-of-Life, and they have `error_count` console errors and a load time of `load_time`.
+
+Write a specific, 2-sentence 'Technical Observation' per site about why this is dangerous for their business (focus on security or lost revenue). Do NOT be salesy. Be clinical.
+
+Reply with only a JSON array of objects {{"id": <site id>, "observation": "<text>"}}, one per site."""),
+        ("human", "{sites}")
+    ])
+    return prompt | get_groq_llm(groq_api_key)
+
+
 def generate_technical_observation(result):
     """
     Generate a technical observation using Groq/LangChain.
@@ -793,7 +1316,7 @@ def generate_technical_observation(result):
     # Get Groq API key from environment
     groq_api_key = os.getenv("GROQ_API_KEY")
     if not groq_api_key:
-        print("[WARN] GROQ_API_KEY not set. Skipping technical observation generation.")
+        log.warning("GROQ_API_KEY not set. Skipping technical observation generation.")
         return None
     
     try:
@@ -802,83 +1325,298 @@ def generate_technical_observation(result):
         error_count = result.get("console_error_count", 0)
         load_time = result.get("load_time", "N/A")
         
-        # Create the LLM
-        llm = ChatGroq(
-            groq_api_key=groq_api_key,
-            model_name="llama-3.3-70b-versatile",
-            temperature=0.3
-        )
-        
-        # Create the prompt template with exact system prompt as specified
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are a Senior Technical Architect. You are analyzing a prospective client's website.
-
-They are running {tech} which is End-of-Life.
-
-They have {error_count} console errors and a load time of {load_time}.
-
-Write a specific, 2-sentence 'Technical Observation' about why this is dangerous for their business (focus on security or lost revenue). Do NOT be salesy. Be clinical."""),
-            ("human", "Generate the technical observation.")
-        ])
-        
-        # Create the chain
-        chain = prompt | llm
+        chain = get_observation_chain(groq_api_key)
         
         # Generate the observation
-        print("[INFO] Generating technical observation with Groq...")
-        response = chain.invoke({
-            "tech": tech,
-            "error_count": error_count,
-            "load_time": load_time
-        })
+        log.info("Generating technical observation with Groq...")
+        with _groq_request_slots:
+            response = chain.invoke({
+                "tech": tech,
+                "error_count": error_count,
+                "load_time": load_time
+            })
         
         observation = response.content.strip()
-        print(f"[INFO] Technical observation generated")
+        log.info(f"Technical observation generated")
         return observation
         
     except Exception as e:
-        print(f"[ERROR] Failed to generate technical observation: {e}")
+        log.error(f"Failed to generate technical observation: {e}")
         return None
 
 
-def diagnose_multiple_sites(urls, generate_observations=True):
+# Sites described per Groq request when generating observations in bulk
+OBSERVATION_BATCH_SIZE = 10
+
+# Groq requests in flight at once across the whole process (kept low to stay
+# under the API rate limits); every request holds a slot while it runs
+OBSERVATION_CONCURRENCY = 5
+_groq_request_slots = threading.BoundedSemaphore(OBSERVATION_CONCURRENCY)
+
+
+def generate_technical_observations_bulk(results, batched=True):
+    """
+    Generate technical observations for several results.
+    
+    With batched=True one Groq request covers OBSERVATION_BATCH_SIZE sites;
+    sites the batched reply doesn't cover (or all of a batch, if the reply
+    isn't valid JSON) fall back to generate_technical_observation(). With
+    batched=False every site gets its own prompt. Either way at most
+    OBSERVATION_CONCURRENCY requests run at once, counting those from
+    concurrent calls.
+    
+    Args:
+        results: List of diagnosis result dictionaries
+        batched: Whether to describe several sites per request
+    
+    Returns:
+        List of observation strings (or None), in the order of results
+    """
+    observations = [None] * len(results)
+    if not results:
+        return observations
+    
+    with ThreadPoolExecutor(max_workers=min(OBSERVATION_CONCURRENCY, len(results))) as executor:
+        if batched and len(results) > 1 and LANGCHAIN_AVAILABLE and os.getenv("GROQ_API_KEY"):
+            batch_starts = range(0, len(results), OBSERVATION_BATCH_SIZE)
+            batches = [results[batch_start:batch_start + OBSERVATION_BATCH_SIZE] for batch_start in batch_starts]
+            for batch_start, batch_observations in zip(batch_starts, executor.map(_observe_batch, batches)):
+                observations[batch_start:batch_start + len(batch_observations)] = batch_observations
+        
+        missing = [idx for idx, observation in enumerate(observations) if observation is None]
+        for idx, observation in zip(missing, executor.map(generate_technical_observation,
+                                                          [results[idx] for idx in missing])):
+            observations[idx] = observation
+    
+    return observations
+
+
+def add_technical_observations(results):
+    """
+    Generate observations for results (see generate_technical_observations_bulk())
+    and store each one under the result's "technical_observation" key.
+    """
+    for result, observation in zip(results, generate_technical_observations_bulk(results)):
+        if observation:
+            result["technical_observation"] = observation
+
+
+def _observe_batch(batch):
+    """
+    Ask Groq for observations on a batch of sites in a single request.
+    
+    Returns:
+        List of observation strings (None where the reply had none)
+    """
+    observations = [None] * len(batch)
+    
+    chain = get_batch_observation_chain(os.getenv("GROQ_API_KEY"))
+    
+    sites = [
+        {
+            "id": idx,
+            "tech": result.get("tech", "Unknown"),
+            "error_count": result.get("console_error_count", 0),
+            "load_time": result.get("load_time", "N/A")
+        }
+        for idx, result in enumerate(batch)
+    ]
+    
+    try:
+        log.info(f"Generating {len(batch)} technical observations with Groq...")
+        with _groq_request_slots:
+            response = chain.invoke({"sites": json.dumps(sites)})
+        # Tolerate a reply wrapped in a ```json code fence
+        content = response.content.strip().strip('`').removeprefix('json').strip()
+        for item in json.loads(content):
+            idx = item.get("id")
+            if isinstance(idx, int) and 0 <= idx < len(batch) and item.get("observation"):
+                observations[idx] = str(item["observation"]).strip()
+    except Exception as e:
+        log.warning(f"Batched observation request failed, falling back to one per site: {e}")
+    
+    return observations
+
+
+# On-disk cache of finished diagnoses, so re-runs over the same URLs skip the
+# browser entirely; entries expire after DIAGNOSIS_CACHE_TTL seconds and the
+# least recently used beyond DIAGNOSIS_CACHE_MAX_ENTRIES are evicted
+DIAGNOSIS_CACHE_DIR = os.environ.get('DIAGNOSIS_CACHE_DIR', '.diag_cache')
+DIAGNOSIS_CACHE_TTL = int(os.environ.get('DIAGNOSIS_CACHE_TTL', 3600))
+DIAGNOSIS_CACHE_MAX_ENTRIES = 1000
+
+# Only completed diagnoses are cached; timeouts and errors are retried
+CACHEABLE_STATUSES = frozenset(['clean', 'at_risk'])
+
+
+def normalize_cache_url(url):
+    """Normalize a URL for cache lookups: lowercase scheme and host, no trailing '/'."""
+    try:
+        parsed = urlparse(url)
+    except ValueError:
+        return url.rstrip('/')
+    return parsed._replace(scheme=parsed.scheme.lower(), netloc=parsed.netloc.lower()).geturl().rstrip('/')
+
+
+def _diagnosis_cache_path(url):
+    key = hashlib.blake2b(normalize_cache_url(url).encode('utf-8', 'surrogatepass'), digest_size=16).hexdigest()
+    return os.path.join(DIAGNOSIS_CACHE_DIR, f"{key}.json")
+
+
+def get_cached_diagnosis(url):
+    """
+    Return the cached diagnosis of url, or None if there is no fresh entry.
+    A hit refreshes the entry's position in the LRU order (not its expiry).
+    """
+    path = _diagnosis_cache_path(url)
+    try:
+        with open(path, 'rb') as f:
+            cached = orjson.loads(f.read())
+    except (OSError, orjson.JSONDecodeError):
+        return None
+    if time.time() - cached.get('cached_at', 0) > DIAGNOSIS_CACHE_TTL:
+        return None
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return cached['result']
+
+
+def cache_diagnosis(url, result):
+    """Store a completed diagnosis on disk, evicting the least recently used entries."""
+    if result.get('status') not in CACHEABLE_STATUSES:
+        return
+    try:
+        os.makedirs(DIAGNOSIS_CACHE_DIR, exist_ok=True)
+        path = _diagnosis_cache_path(url)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(orjson.dumps({'cached_at': time.time(), 'result': result}))
+        os.replace(tmp_path, path)
+        
+        entries = [entry for entry in os.scandir(DIAGNOSIS_CACHE_DIR) if entry.name.endswith('.json')]
+        if len(entries) > DIAGNOSIS_CACHE_MAX_ENTRIES:
+            entries.sort(key=lambda entry: entry.stat().st_mtime)
+            for entry in entries[:len(entries) - DIAGNOSIS_CACHE_MAX_ENTRIES]:
+                os.remove(entry.path)
+    except OSError as e:
+        log.warning(f"Could not cache diagnosis of {url}: {e}")
+
+
+def diagnose_multiple_sites(urls, generate_observations=True, concurrency=DIAGNOSE_CONCURRENCY, use_cache=False):
     """
     Diagnose multiple websites and return results for each.
     
+    Up to `concurrency` sites load at once. Each worker thread launches one
+    browser and reuses it (a fresh context per site) for every URL it takes,
+    relaunching it if it dies (see drain_with_shared_browser()).
+    Technical observations for vulnerable sites are generated in batches while
+    the remaining sites are still loading.
+    
     Args:
         urls: List of URLs to diagnose
         generate_observations: Whether to generate technical observations using Groq
+        concurrency: Number of sites diagnosed in parallel
+        use_cache: Reuse fresh results from the on-disk diagnosis cache and
+            store new ones there
     
     Returns:
-        List of diagnosis results (JSON objects)
+        List of diagnosis results (JSON objects), in the order of urls
     """
-    results = []
-    for url in urls:
-        # Ensure URL has protocol
-        if not url.startswith(('http://', 'https://')):
-            url = 'https://' + url
-        
-        result = diagnose_site(url)
+    # Ensure URLs have a protocol
+    urls = [url if url.startswith(('http://', 'https://')) else 'https://' + url for url in urls]
+    results = [None] * len(urls)
+    if use_cache:
+        for idx, url in enumerate(urls):
+            results[idx] = get_cached_diagnosis(url)
+            if results[idx] is not None:
+                log.info(f"Using cached diagnosis for {url}")
+    to_diagnose = [(idx, url) for idx, url in enumerate(urls) if results[idx] is None]
+    pending = iter(to_diagnose)
+    pending_lock = threading.Lock()
+    
+    # Observations are requested as soon as OBSERVATION_BATCH_SIZE vulnerable
+    # sites are diagnosed, overlapping Groq latency with the remaining page loads
+    observation_executor = ThreadPoolExecutor(max_workers=OBSERVATION_CONCURRENCY)
+    observation_futures = []
+    observation_batch = []
+    observation_lock = threading.Lock()
+    
+    def queue_observation(result, flush=False):
+        # Cached results keep the observation they were stored with
+        if result is not None and (not result.get("vulnerability_detected", False)
+                                   or result.get("technical_observation")):
+            result = None
+        with observation_lock:
+            if result is not None:
+                observation_batch.append(result)
+            if not observation_batch or (len(observation_batch) < OBSERVATION_BATCH_SIZE and not flush):
+                return
+            batch = observation_batch[:]
+            observation_batch.clear()
+            observation_futures.append(observation_executor.submit(add_technical_observations, batch))
+    
+    def take():
+        with pending_lock:
+            return next(pending, None)
+    
+    def diagnose(item, browser):
+        idx, url = item
+        try:
+            results[idx] = diagnose_site(url, browser)
+        except Exception as e:
+            # e.g. the shared browser died mid-page; keep the other results
+            log.error(f"Diagnosis failed for {url}: {e}")
+            results[idx] = failed_diagnosis(url, e)
+        if generate_observations:
+            queue_observation(results[idx])
+    
+    def worker():
+        drain_with_shared_browser(take, diagnose)
+    
+    with observation_executor:
+        if generate_observations:
+            for result in results:
+                queue_observation(result)
         
-        # Generate technical observation if requested and vulnerabilities detected
-        if generate_observations and result.get("vulnerability_detected", False):
-            observation = generate_technical_observation(result)
-            if observation:
-                result["technical_observation"] = observation
+        if to_diagnose:
+            precompile()
+            workers = max(1, min(concurrency, len(to_diagnose)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for future in [executor.submit(worker) for _ in range(workers)]:
+                    future.result()
         
-        results.append(result)
-        print()  # Empty line between results
+        # Generate technical observations for the last, partial batch
+        if generate_observations:
+            queue_observation(None, flush=True)
+        for future in observation_futures:
+            future.result()
+    
+    if use_cache:
+        for idx, url in to_diagnose:
+            cache_diagnosis(url, results[idx])
     
     return results
 
 
 if __name__ == "__main__":
+    from results_store import PYARROW_AVAILABLE, write_results_parquet
+    
     # Default URL if none provided
     TARGET_URLS = ["https://algofolks.com/"]
     
-    # Allow URLs to be passed as command line arguments
-    if len(sys.argv) > 1:
-        TARGET_URLS = sys.argv[1:]
+    # Allow URLs to be passed as command line arguments; --no-cache forces
+    # fresh diagnoses instead of reusing ones from the last hour
+    args = sys.argv[1:]
+    use_cache = '--no-cache' not in args
+    args = [arg for arg in args if arg != '--no-cache']
+    if args:
+        TARGET_URLS = args
+    
+    # Large pages get scanned in worker processes unless the env var says otherwise
+    if 'STATIC_DETECTION_PROCESSES' not in os.environ:
+        STATIC_DETECTION_PROCESSES = max((os.cpu_count() or 1) - 1, 0)
     
     print("=" * 60)
     print("Website Diagnosis Tool")
@@ -886,28 +1624,51 @@ if __name__ == "__main__":
     print(f"Checking {len(TARGET_URLS)} domain(s)...\n")
     
     # Diagnose all sites
-    all_results = diagnose_multiple_sites(TARGET_URLS)
+    all_results = diagnose_multiple_sites(TARGET_URLS, use_cache=use_cache)
     
     # Output JSON results
+    flush_log()
     print("\n" + "=" * 60)
     print("FINAL RESULTS (JSON)")
     print("=" * 60)
     
-    if len(all_results) == 1:
-        # Single result - output as single object
-        print(json.dumps(all_results[0], indent=2))
-    else:
-        # Multiple results - output as array
-        print(json.dumps(all_results, indent=2))
-    
-    # Also save to file
+    # Compact JSON for the file (and for piped stdout), written one result at
+    # a time; pretty-printed only when a person is reading the terminal
     output_file = "diagnosis_results.json"
-    with open(output_file, 'w') as f:
+    pretty = sys.stdout.isatty()
+    sys.stdout.flush()
+    with open(output_file, 'wb') as f:
+        sinks = [f] if pretty else [f, sys.stdout.buffer]
+        
+        def emit(data):
+            for sink in sinks:
+                sink.write(data)
+        
         if len(all_results) == 1:
-            json.dump(all_results[0], f, indent=2)
+            # Single result - output as single object
+            emit(orjson.dumps(all_results[0]))
         else:
-            json.dump(all_results, f, indent=2)
+            # Multiple results - output as array
+            emit(b"[")
+            for idx, result in enumerate(all_results):
+                if idx:
+                    emit(b",")
+                emit(orjson.dumps(result))
+            emit(b"]")
+    
+    if pretty:
+        payload = all_results[0] if len(all_results) == 1 else all_results
+        sys.stdout.buffer.write(orjson.dumps(payload, option=orjson.OPT_INDENT_2))
+    sys.stdout.buffer.write(b"\n")
+    sys.stdout.flush()
     
     print(f"\n[INFO] Results also saved to {output_file}")
-
-
+    
+    # Columnar copy for bulk workflows (e.g. export_company_list_to_excel)
+    if PYARROW_AVAILABLE and all_results:
+        parquet_file = "diagnosis_results.parquet"
+        try:
+            write_results_parquet(all_results, parquet_file)
+            print(f"[INFO] Results also saved to {parquet_file}")
+        except Exception as e:
+            print(f"[WARN] Could not save Parquet results: {e}")
@@ -7,9 +7,13 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
-def send_email(recipient_email, subject, body):
+# Implicit-TLS submission port; connections here skip STARTTLS
+SMTP_SSL_PORT = 465
+
+def get_smtp_settings():
     """
-    Sends an email using SMTP settings from environment variables.
+    Read SMTP settings from environment variables.
+    Returns (server, port, username, password, email_from).
     """
     smtp_server = os.getenv("SMTP_SERVER")
     smtp_port = os.getenv("SMTP_PORT")
@@ -20,21 +24,109 @@ def send_email(recipient_email, subject, body):
     if not all([smtp_server, smtp_port, smtp_username, smtp_password, email_from]):
         raise ValueError("Missing SMTP configuration in environment variables.")
 
-    # Create the email message
+    return smtp_server, int(smtp_port), smtp_username, smtp_password, email_from
+
+def open_smtp_connection():
+    """
+    Connect, upgrade to TLS and log in to the configured SMTP server.
+    On port 465 the connection is TLS from the start (SMTP_SSL), which
+    skips the STARTTLS round-trip.
+    The caller is responsible for closing it (it works as a context manager).
+    """
+    smtp_server, smtp_port, smtp_username, smtp_password, _ = get_smtp_settings()
+    if smtp_port == SMTP_SSL_PORT:
+        server = smtplib.SMTP_SSL(smtp_server, smtp_port)
+    else:
+        server = smtplib.SMTP(smtp_server, smtp_port)
+    try:
+        if smtp_port != SMTP_SSL_PORT:
+            server.starttls()  # Secure the connection
+        server.login(smtp_username, smtp_password)
+    except Exception:
+        server.close()
+        raise
+    return server
+
+def build_message(recipient_email, subject, body):
+    """Create the plain-text email message."""
     msg = MIMEMultipart()
-    msg['From'] = email_from
+    msg['From'] = get_smtp_settings()[4]
     msg['To'] = recipient_email
     msg['Subject'] = subject
 
     msg.attach(MIMEText(body, 'plain'))
+    return msg
+
+def send_email(recipient_email, subject, body, server=None):
+    """
+    Sends an email using SMTP settings from environment variables.
+    Pass an open connection from open_smtp_connection() to reuse it;
+    otherwise a connection is opened just for this email.
+    """
+    # Create the email message
+    msg = build_message(recipient_email, subject, body)
 
     try:
+        if server is not None:
+            server.send_message(msg)
+            return True
+
         # Connect to the server and send the email
-        with smtplib.SMTP(smtp_server, int(smtp_port)) as server:
-            server.starttls()  # Secure the connection
-            server.login(smtp_username, smtp_password)
+        with open_smtp_connection() as server:
             server.send_message(msg)
         return True
     except Exception as e:
         print(f"Error sending email: {e}")
         raise e
+
+def send_bulk_emails(emails):
+    """
+    Send several emails over a single SMTP connection, so the TLS and
+    login handshake is paid once instead of per message.
+
+    Args:
+        emails: List of (recipient_email, subject, body) tuples
+
+    Returns:
+        List of (recipient_email, error) pairs in input order; error is
+        None for emails that were sent. SMTP and connection errors are
+        recorded per email rather than raised, so the list always covers
+        every email; if connecting or logging in fails, that error is
+        recorded for every email not yet sent.
+    """
+    results = []
+    server = None
+    try:
+        for position, (recipient_email, subject, body) in enumerate(emails):
+            if server is None:
+                try:
+                    server = open_smtp_connection()
+                except OSError as e:
+                    # Connect or login failed (SMTPAuthenticationError is an
+                    # OSError too); retrying per email would only repeat the
+                    # login and risk locking the account, so fail the rest
+                    error = str(e)
+                    results.extend((email[0], error) for email in emails[position:])
+                    break
+            try:
+                send_email(recipient_email, subject, body, server=server)
+                results.append((recipient_email, None))
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as e:
+                # Rejected message; smtplib has reset the session, so the
+                # connection stays usable for the remaining emails
+                results.append((recipient_email, str(e)))
+            except OSError as e:
+                # Any other SMTP error (SMTPException is an OSError) or socket
+                # failure leaves the connection in doubt: drop it and
+                # reconnect for the remaining emails
+                server.close()
+                server = None
+                results.append((recipient_email, str(e)))
+    finally:
+        if server is not None:
+            try:
+                server.quit()
+            except OSError:
+                # Already dropped; every email's outcome is recorded anyway
+                pass
+    return results
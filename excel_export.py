@@ -3,69 +3,128 @@ Excel Export Utility Module
 Handles exporting diagnosis results to Excel format with proper formatting.
 """
 import os
-import pandas as pd
 from datetime import datetime
-from openpyxl import load_workbook
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
+from export_rows import COMPANY_LIST_HEADERS, company_list_row
+from results_store import iter_results_parquet
 
+# Shared cell styles, built once and reused for every cell
+HEADER_FILL = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+HEADER_FONT = Font(bold=True, color="FFFFFF", size=11)
+BORDER_STYLE = Border(
+    left=Side(style='thin'),
+    right=Side(style='thin'),
+    top=Side(style='thin'),
+    bottom=Side(style='thin')
+)
+CENTER_ALIGN = Alignment(horizontal='center', vertical='center')
+WRAP_ALIGN = Alignment(horizontal='left', vertical='top', wrap_text=True)
 
-def format_excel_worksheet(worksheet, title="Website Diagnosis Results"):
+# Columns holding free text; they wrap, every other column is centered
+TEXT_COLUMNS = frozenset('ABCDEHJKLM')
+
+# Maps the characters not wanted in file and sheet names to underscores
+SAFE_NAME_TABLE = str.maketrans('./', '__')
+
+# Field names of the per-result overview sheets, in row order
+OVERVIEW_FIELDS = (
+    'URL',
+    'Domain',
+    'Technology',
+    'Status',
+    'Load Time',
+    'First Contentful Paint (ms)',
+    'Console Error Count',
+    'Vulnerability Detected',
+    'Vulnerabilities Count',
+)
+
+
+def overview_values(result):
+    """Values for the OVERVIEW_FIELDS rows of a diagnosis result, in the same order."""
+    return (
+        result.get('url', 'N/A'),
+        result.get('domain', 'N/A'),
+        result.get('tech', 'Unknown'),
+        result.get('status', 'unknown'),
+        result.get('load_time', 'N/A'),
+        result.get('first_contentful_paint_ms', 'N/A'),
+        result.get('console_error_count', 0),
+        'Yes' if result.get('vulnerability_detected', False) else 'No',
+        len(result.get('vulnerabilities', [])),
+    )
+
+
+def fit_column_width(max_length):
+    """Column width for content of max_length characters: padded, capped at 50, at least 12."""
+    return max(min(max_length + 2, 50), 12)
+
+
+def write_formatted_sheet(workbook, title, headers, rows, column_widths=None):
     """
-    Apply professional formatting to Excel worksheet.
+    Stream a header row and data rows into a write-only workbook: styled,
+    bordered header; bordered data cells, wrapped in TEXT_COLUMNS and
+    centered elsewhere.
     
     Args:
-        worksheet: openpyxl worksheet object
-        title: Title for the worksheet
+        workbook: openpyxl Workbook created with write_only=True
+        title: Sheet name
+        headers: List of column titles
+        rows: Iterable of row value lists
+        column_widths: Optional dict of fixed widths by column letter. When
+            omitted, widths are fitted to the content, which means the rows
+            are held until all are built (column widths must be set before
+            the first row is written).
     """
-    # Define styles
-    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=11)
-    title_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-    title_font = Font(bold=True, color="FFFFFF", size=14)
-    border_style = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
-    center_alignment = Alignment(horizontal='center', vertical='center')
-    wrap_alignment = Alignment(horizontal='left', vertical='top', wrap_text=True)
+    worksheet = workbook.create_sheet(title)
     
-    # Format header row
-    if worksheet.max_row > 0:
-        for cell in worksheet[1]:
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = center_alignment
-            cell.border = border_style
+    # Text columns wrap, the rest are centered
+    alignments = [
+        WRAP_ALIGN if get_column_letter(idx) in TEXT_COLUMNS else CENTER_ALIGN
+        for idx in range(1, len(headers) + 1)
+    ]
     
-    # Apply borders and alignment to all data cells
-    for row in worksheet.iter_rows(min_row=2, max_row=worksheet.max_row):
-        for cell in row:
-            cell.border = border_style
-            if cell.column_letter in ['A', 'B', 'C', 'D', 'E', 'H', 'J', 'K', 'L', 'M']:  # Text columns
-                cell.alignment = wrap_alignment
-            else:
-                cell.alignment = center_alignment
+    header_cells = []
+    for value in headers:
+        cell = WriteOnlyCell(worksheet, value=value)
+        cell.fill = HEADER_FILL
+        cell.font = HEADER_FONT
+        cell.alignment = CENTER_ALIGN
+        cell.border = BORDER_STYLE
+        header_cells.append(cell)
     
-    # Auto-adjust column widths
-    for column in worksheet.columns:
-        max_length = 0
-        column_letter = get_column_letter(column[0].column)
-        
-        for cell in column:
-            try:
-                if cell.value:
-                    cell_length = len(str(cell.value))
-                    if cell_length > max_length:
-                        max_length = cell_length
-            except:
-                pass
-        
-        # Set column width with some padding
-        adjusted_width = min(max_length + 2, 50)  # Cap at 50 characters
-        worksheet.column_dimensions[column_letter].width = max(adjusted_width, 12)
+    if column_widths is not None:
+        for column_letter, width in column_widths.items():
+            worksheet.column_dimensions[column_letter].width = width
+        worksheet.append(header_cells)
+    
+    # Widths are measured while the cells are built; when fitting to content
+    # the built rows are held until the widths are known
+    max_lengths = [len(str(value)) if value else 0 for value in headers]
+    pending_rows = []
+    for row in rows:
+        cells = []
+        for idx, (value, alignment) in enumerate(zip(row, alignments)):
+            cell = WriteOnlyCell(worksheet, value=value)
+            cell.border = BORDER_STYLE
+            cell.alignment = alignment
+            cells.append(cell)
+            if value and column_widths is None:
+                max_lengths[idx] = max(max_lengths[idx], len(str(value)))
+        if column_widths is None:
+            pending_rows.append(cells)
+        else:
+            worksheet.append(cells)
+    
+    if column_widths is None:
+        for idx, max_length in enumerate(max_lengths, 1):
+            worksheet.column_dimensions[get_column_letter(idx)].width = fit_column_width(max_length)
+        worksheet.append(header_cells)
+        for cells in pending_rows:
+            worksheet.append(cells)
 
 
 def export_single_result_to_excel(result_data, output_path=None):
@@ -82,89 +141,46 @@ def export_single_result_to_excel(result_data, output_path=None):
     if output_path is None:
         domain = result_data.get('domain', 'unknown')
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        safe_domain = domain.replace('.', '_').replace('/', '_')[:30]
+        safe_domain = domain.translate(SAFE_NAME_TABLE)[:30]
         filename = f"diagnosis_{safe_domain}_{timestamp}.xlsx"
         output_path = os.path.join('results', filename)
     
     # Ensure results directory exists
     os.makedirs('results', exist_ok=True)
     
-    # Create Excel writer
-    with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-        # Main Overview Sheet
-        overview_data = {
-            'Field': [
-                'URL',
-                'Domain',
-                'Technology',
-                'Status',
-                'Load Time',
-                'First Contentful Paint (ms)',
-                'Console Error Count',
-                'Vulnerability Detected',
-                'Vulnerabilities Count',
-                'Diagnosis Date'
-            ],
-            'Value': [
-                result_data.get('url', 'N/A'),
-                result_data.get('domain', 'N/A'),
-                result_data.get('tech', 'Unknown'),
-                result_data.get('status', 'unknown'),
-                result_data.get('load_time', 'N/A'),
-                result_data.get('first_contentful_paint_ms', 'N/A'),
-                result_data.get('console_error_count', 0),
-                'Yes' if result_data.get('vulnerability_detected', False) else 'No',
-                len(result_data.get('vulnerabilities', [])),
-                datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            ]
-        }
-        overview_df = pd.DataFrame(overview_data)
-        overview_df.to_excel(writer, sheet_name='Overview', index=False)
-        
-        # Technical Observation Sheet
-        if result_data.get('technical_observation'):
-            observation_data = {
-                'Technical Observation': [result_data.get('technical_observation')]
-            }
-            observation_df = pd.DataFrame(observation_data)
-            observation_df.to_excel(writer, sheet_name='Technical Observation', index=False)
-        
-        # Vulnerabilities Sheet
-        vulnerabilities = result_data.get('vulnerabilities', [])
-        if vulnerabilities:
-            vuln_data = []
-            for vuln in vulnerabilities:
-                vuln_data.append({
-                    'Type': vuln.get('type', 'N/A'),
-                    'Version': vuln.get('version', 'unknown'),
-                    'Matched Text': vuln.get('matched_text', '')[:200]  # Limit length
-                })
-            vuln_df = pd.DataFrame(vuln_data)
-            vuln_df.to_excel(writer, sheet_name='Vulnerabilities', index=False)
-        else:
-            # Create empty sheet with message
-            empty_df = pd.DataFrame({'Message': ['No vulnerabilities detected']})
-            empty_df.to_excel(writer, sheet_name='Vulnerabilities', index=False)
-        
-        # Console Errors Sheet
-        console_errors = result_data.get('console_errors', [])
-        if console_errors:
-            error_data = {
-                'Error Number': range(1, len(console_errors) + 1),
-                'Error Message': console_errors
-            }
-            error_df = pd.DataFrame(error_data)
-            error_df.to_excel(writer, sheet_name='Console Errors', index=False)
-        else:
-            # Create empty sheet with message
-            empty_df = pd.DataFrame({'Message': ['No console errors detected']})
-            empty_df.to_excel(writer, sheet_name='Console Errors', index=False)
+    # Write-only workbook: rows stream straight to the file, formatted as written
+    workbook = Workbook(write_only=True)
     
-    # Apply formatting to all sheets
-    workbook = load_workbook(output_path)
-    for sheet_name in workbook.sheetnames:
-        worksheet = workbook[sheet_name]
-        format_excel_worksheet(worksheet, title=sheet_name)
+    # Main Overview Sheet
+    overview_rows = list(zip(OVERVIEW_FIELDS, overview_values(result_data)))
+    overview_rows.append(['Diagnosis Date', datetime.now().strftime('%Y-%m-%d %H:%M:%S')])
+    write_formatted_sheet(workbook, 'Overview', ['Field', 'Value'], overview_rows)
+    
+    # Technical Observation Sheet
+    if result_data.get('technical_observation'):
+        write_formatted_sheet(workbook, 'Technical Observation', ['Technical Observation'],
+                              [[result_data.get('technical_observation')]])
+    
+    # Vulnerabilities Sheet
+    vulnerabilities = result_data.get('vulnerabilities', [])
+    if vulnerabilities:
+        vuln_rows = [
+            [vuln.get('type', 'N/A'), vuln.get('version', 'unknown'), vuln.get('matched_text', '')[:200]]  # Limit length
+            for vuln in vulnerabilities
+        ]
+        write_formatted_sheet(workbook, 'Vulnerabilities', ['Type', 'Version', 'Matched Text'], vuln_rows)
+    else:
+        # Create empty sheet with message
+        write_formatted_sheet(workbook, 'Vulnerabilities', ['Message'], [['No vulnerabilities detected']])
+    
+    # Console Errors Sheet
+    console_errors = result_data.get('console_errors', [])
+    if console_errors:
+        error_rows = [[idx, error] for idx, error in enumerate(console_errors, 1)]
+        write_formatted_sheet(workbook, 'Console Errors', ['Error Number', 'Error Message'], error_rows)
+    else:
+        # Create empty sheet with message
+        write_formatted_sheet(workbook, 'Console Errors', ['Message'], [['No console errors detected']])
     
     workbook.save(output_path)
     return output_path
@@ -189,67 +205,40 @@ def export_bulk_results_to_excel(results_list, output_path=None):
     # Ensure results directory exists
     os.makedirs('results', exist_ok=True)
     
-    # Create Excel writer
-    with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-        # Summary Sheet
-        summary_data = []
-        for idx, result in enumerate(results_list, 1):
-            summary_data.append({
-                'No.': idx,
-                'URL': result.get('url', 'N/A'),
-                'Domain': result.get('domain', 'N/A'),
-                'Technology': result.get('tech', 'Unknown'),
-                'Status': result.get('status', 'unknown'),
-                'Load Time': result.get('load_time', 'N/A'),
-                'FCP (ms)': result.get('first_contentful_paint_ms', 'N/A'),
-                'Console Errors': result.get('console_error_count', 0),
-                'Vulnerabilities': len(result.get('vulnerabilities', [])),
-                'Vulnerability Detected': 'Yes' if result.get('vulnerability_detected', False) else 'No',
-                'Technical Observation': result.get('technical_observation', 'N/A')
-            })
-        
-        summary_df = pd.DataFrame(summary_data)
-        summary_df.to_excel(writer, sheet_name='Summary', index=False)
-        
-        # Individual result sheets
-        for idx, result in enumerate(results_list, 1):
-            domain = result.get('domain', f'result_{idx}')
-            safe_domain = domain.replace('.', '_').replace('/', '_')[:25]
-            sheet_name = f"{idx}_{safe_domain}"[:31]  # Excel sheet name limit
-            
-            # Overview for this result
-            overview_data = {
-                'Field': [
-                    'URL',
-                    'Domain',
-                    'Technology',
-                    'Status',
-                    'Load Time',
-                    'First Contentful Paint (ms)',
-                    'Console Error Count',
-                    'Vulnerability Detected',
-                    'Vulnerabilities Count'
-                ],
-                'Value': [
-                    result.get('url', 'N/A'),
-                    result.get('domain', 'N/A'),
-                    result.get('tech', 'Unknown'),
-                    result.get('status', 'unknown'),
-                    result.get('load_time', 'N/A'),
-                    result.get('first_contentful_paint_ms', 'N/A'),
-                    result.get('console_error_count', 0),
-                    'Yes' if result.get('vulnerability_detected', False) else 'No',
-                    len(result.get('vulnerabilities', []))
-                ]
-            }
-            overview_df = pd.DataFrame(overview_data)
-            overview_df.to_excel(writer, sheet_name=sheet_name, index=False)
+    workbook = Workbook(write_only=True)
     
-    # Apply formatting to all sheets
-    workbook = load_workbook(output_path)
-    for sheet_name in workbook.sheetnames:
-        worksheet = workbook[sheet_name]
-        format_excel_worksheet(worksheet, title=sheet_name)
+    # Summary Sheet
+    summary_headers = [
+        'No.', 'URL', 'Domain', 'Technology', 'Status', 'Load Time', 'FCP (ms)',
+        'Console Errors', 'Vulnerabilities', 'Vulnerability Detected', 'Technical Observation'
+    ]
+    summary_rows = [
+        [
+            idx,
+            result.get('url', 'N/A'),
+            result.get('domain', 'N/A'),
+            result.get('tech', 'Unknown'),
+            result.get('status', 'unknown'),
+            result.get('load_time', 'N/A'),
+            result.get('first_contentful_paint_ms', 'N/A'),
+            result.get('console_error_count', 0),
+            len(result.get('vulnerabilities', [])),
+            'Yes' if result.get('vulnerability_detected', False) else 'No',
+            result.get('technical_observation', 'N/A')
+        ]
+        for idx, result in enumerate(results_list, 1)
+    ]
+    write_formatted_sheet(workbook, 'Summary', summary_headers, summary_rows)
+    
+    # Individual result sheets
+    for idx, result in enumerate(results_list, 1):
+        domain = result.get('domain', f'result_{idx}')
+        safe_domain = domain.translate(SAFE_NAME_TABLE)[:25]
+        sheet_name = f"{idx}_{safe_domain}"[:31]  # Excel sheet name limit
+        
+        # Overview for this result
+        overview_rows = zip(OVERVIEW_FIELDS, overview_values(result))
+        write_formatted_sheet(workbook, sheet_name, ['Field', 'Value'], overview_rows)
     
     workbook.save(output_path)
     return output_path
@@ -261,12 +250,16 @@ def export_company_list_to_excel(results_list, output_path=None):
     Creates a comprehensive single-sheet export with all diagnosis data.
     
     Args:
-        results_list: List of diagnosis result dictionaries
+        results_list: List or iterable of diagnosis result dictionaries (consumed
+            lazily), or the path of a Parquet file from write_results_parquet()
         output_path: Optional path to save the Excel file. If None, generates filename.
     
     Returns:
         Path to the saved Excel file
     """
+    if isinstance(results_list, (str, os.PathLike)):
+        results_list = iter_results_parquet(results_list)
+    
     if output_path is None:
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f"company_diagnosis_export_{timestamp}.xlsx"
@@ -275,65 +268,6 @@ def export_company_list_to_excel(results_list, output_path=None):
     # Ensure results directory exists
     os.makedirs('results', exist_ok=True)
     
-    # Prepare data for Excel
-    export_data = []
-    
-    for result in results_list:
-        # Format vulnerabilities as comma-separated list
-        vulnerabilities = result.get('vulnerabilities', [])
-        vuln_list = ', '.join([f"{v.get('type', 'N/A')} (v{v.get('version', 'unknown')})" 
-                              for v in vulnerabilities]) if vulnerabilities else 'None'
-        
-        # Format console errors (truncated summary)
-        console_errors = result.get('console_errors', [])
-        if console_errors:
-            # Show first 3 errors, truncate if too long
-            error_summary = []
-            for i, error in enumerate(console_errors[:3]):
-                truncated_error = error[:100] + '...' if len(error) > 100 else error
-                error_summary.append(f"{i+1}. {truncated_error}")
-            if len(console_errors) > 3:
-                error_summary.append(f"... and {len(console_errors) - 3} more errors")
-            console_errors_text = ' | '.join(error_summary)
-        else:
-            console_errors_text = 'None'
-        
-        # Get diagnosis date from file modification time or use current date
-        diagnosis_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        if 'modified' in result:
-            try:
-                diagnosis_date = datetime.fromtimestamp(result['modified']).strftime('%Y-%m-%d %H:%M:%S')
-            except:
-                pass
-        
-        export_data.append({
-            'Domain': result.get('domain', 'N/A'),
-            'URL': result.get('url', 'N/A'),
-            'Technology': result.get('tech', 'Unknown'),
-            'Status': result.get('status', 'unknown'),
-            'Load Time': result.get('load_time', 'N/A'),
-            'FCP (ms)': result.get('first_contentful_paint_ms', 'N/A'),
-            'Console Errors Count': result.get('console_error_count', 0),
-            'Console Errors': console_errors_text,
-            'Vulnerabilities Count': len(vulnerabilities),
-            'Vulnerabilities': vuln_list,
-            'Vulnerability Detected': 'Yes' if result.get('vulnerability_detected', False) else 'No',
-            'Technical Observation': result.get('technical_observation', 'N/A'),
-            'Diagnosis Date': diagnosis_date
-        })
-    
-    # Create DataFrame
-    df = pd.DataFrame(export_data)
-    
-    # Create Excel file
-    with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-        df.to_excel(writer, sheet_name='Company Diagnosis List', index=False)
-    
-    # Apply formatting
-    workbook = load_workbook(output_path)
-    worksheet = workbook['Company Diagnosis List']
-    format_excel_worksheet(worksheet, title='Company Diagnosis List')
-    
     # Set specific column widths for better readability
     column_widths = {
         'A': 25,  # Domain
@@ -351,8 +285,12 @@ def export_company_list_to_excel(results_list, output_path=None):
         'M': 20   # Diagnosis Date
     }
     
-    for col, width in column_widths.items():
-        worksheet.column_dimensions[col].width = width
+    # Fixed widths mean rows can be streamed one at a time
+    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    workbook = Workbook(write_only=True)
+    write_formatted_sheet(workbook, 'Company Diagnosis List', COMPANY_LIST_HEADERS,
+                          (company_list_row(result, now) for result in results_list), column_widths)
     
     workbook.save(output_path)
     return output_path
+
@@ -0,0 +1,74 @@
+"""
+Export Rows Utility Module
+Builds the company list rows shared by the Excel and Google Sheets exports.
+"""
+from datetime import datetime
+
+# Columns of the company list exports (Excel sheet and Google Sheets tab),
+# matching the values company_list_row() builds
+COMPANY_LIST_HEADERS = [
+    'Domain', 'URL', 'Technology', 'Status', 'Load Time', 'FCP (ms)',
+    'Console Errors Count', 'Console Errors', 'Vulnerabilities Count', 'Vulnerabilities',
+    'Vulnerability Detected', 'Technical Observation', 'Diagnosis Date'
+]
+
+
+def join_vulnerabilities(vulnerabilities):
+    """Format vulnerabilities as a comma-separated "type (vversion)" list ('None' when empty)."""
+    if not vulnerabilities:
+        return 'None'
+    return ', '.join([f"{v.get('type', 'N/A')} (v{v.get('version', 'unknown')})"
+                      for v in vulnerabilities])
+
+
+def company_list_row(result, now=None, format_vulnerabilities=join_vulnerabilities):
+    """
+    Build one company list export row (COMPANY_LIST_HEADERS columns) from a
+    diagnosis result.
+
+    Args:
+        result: Diagnosis result dictionary
+        now: Current time as '%Y-%m-%d %H:%M:%S', used when the result has no
+            'modified' timestamp; exports format it once and pass it to every row
+        format_vulnerabilities: Builds the Vulnerabilities cell from the
+            result's vulnerability list, e.g. to respect a cell length limit
+    """
+    get = result.get
+    
+    vulnerabilities = get('vulnerabilities', [])
+    vuln_list = format_vulnerabilities(vulnerabilities)
+    
+    # Format console errors (first 3, each truncated to 100 chars)
+    console_errors = get('console_errors', [])
+    if console_errors:
+        error_summary = [f"{i}. {error[:100] + '...' if len(error) > 100 else error}"
+                         for i, error in enumerate(console_errors[:3], 1)]
+        if len(console_errors) > 3:
+            error_summary.append(f"... and {len(console_errors) - 3} more errors")
+        console_errors_text = ' | '.join(error_summary)
+    else:
+        console_errors_text = 'None'
+    
+    # Diagnosis date from the file modification time, else the current time
+    diagnosis_date = now or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    if 'modified' in result:
+        try:
+            diagnosis_date = datetime.fromtimestamp(result['modified']).strftime('%Y-%m-%d %H:%M:%S')
+        except (TypeError, ValueError, OverflowError, OSError):
+            pass
+    
+    return [
+        get('domain', 'N/A'),
+        get('url', 'N/A'),
+        get('tech', 'Unknown'),
+        get('status', 'unknown'),
+        get('load_time', 'N/A'),
+        get('first_contentful_paint_ms', 'N/A'),
+        get('console_error_count', 0),
+        console_errors_text,
+        len(vulnerabilities),
+        vuln_list,
+        'Yes' if get('vulnerability_detected', False) else 'No',
+        get('technical_observation', 'N/A'),
+        diagnosis_date
+    ]
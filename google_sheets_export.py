@@ -3,10 +3,23 @@ Google Sheets Export Utility Module
 Handles exporting diagnosis results to Google Sheets.
 """
 import os
+import io
+import csv
+import time
+import atexit
+import tempfile
+import collections
+import random
+import threading
+import orjson
 import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+from concurrent.futures import Future, ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from tenacity import retry, retry_if_exception, wait_exponential_jitter, stop_after_attempt
+from google.oauth2.service_account import Credentials
+from google.auth.transport.requests import AuthorizedSession
 from datetime import datetime
-import json
+from export_rows import COMPANY_LIST_HEADERS, company_list_row
 
 # Define scope
 SCOPE = [
@@ -20,17 +33,149 @@ SCOPE = [
 # This sheet must be shared with the service account email
 SPREADSHEET_ID = "1KBllOOa6yIhaC-J1I6sQL74jgwpakCXAkhAZ7lDkx-w"
 
+# Drive folder new spreadsheets are created in (None: the service account's root)
+FOLDER_ID = os.environ.get('GOOGLE_DRIVE_FOLDER_ID')
+
+# Spreadsheet ids resolved by create_or_get_sheet(), by title
+SHEET_ID_CACHE_TTL = 600
+SHEET_ID_CACHE_SIZE = 128
+_sheet_ids = {}
+_sheet_ids_lock = threading.Lock()
+
+# Rows written per values.batchUpdate call when exporting many results
+ROWS_PER_WRITE = 2000
+
+# Per-result tab sets sent in one batchUpdate by export_many_results_to_gsheet,
+# and how many of those calls run at once (Sheets allows ~60 writes/min/user)
+RESULTS_PER_BATCH_UPDATE = 20
+SHEETS_WRITE_CONCURRENCY = 4
+
+# Diagnoses that failed outright (diagnose_site() sets 'timeout' when the page
+# never loaded and 'error' when the diagnosis raised) are logged as one row in
+# a shared tab instead of getting their own set of tabs
+FAILED_STATUSES = frozenset({'timeout', 'error'})
+FAILURES_TAB_TITLE = "Failures"
+FAILURES_HEADERS = ["URL", "Domain", "Status", "Error", "Diagnosis Date"]
+_failures_sheet_id = None
+_failures_lock = threading.Lock()
+
+# Company lists longer than this are uploaded to Drive as one CSV file that
+# Drive converts to a new spreadsheet (needs FOLDER_ID, since the service
+# account itself has no Drive storage quota)
+CSV_UPLOAD_MIN_ROWS = 500
+DRIVE_UPLOAD_URL = "https://www.googleapis.com/upload/drive/v3/files"
+
+# Results buffered by queue_single_result() until this many are waiting; they
+# are then written together as one bulk tab (also flushed at exit)
+QUEUED_EXPORT_BATCH_SIZE = 50
+_queued_results = collections.deque()
+_queued_results_lock = threading.Lock()
+
+# Authorized client and master spreadsheet handle, created on first export and
+# reused so the JWT signing, token fetch and TLS setup happen once per process
+_client = None
+_master_sheet = None
+_client_lock = threading.Lock()
+
+# Keep-alive connections held to the Sheets API across exports
+HTTP_POOL_CONNECTIONS = 4
+HTTP_POOL_MAXSIZE = 16
+
+# HTTP statuses worth retrying: quota exceeded and transient server errors
+QUOTA_STATUS_CODE = 429
+RETRYABLE_STATUS_CODES = frozenset({QUOTA_STATUS_CODE, 500, 502, 503, 504})
+
+def is_retryable(error):
+    """Whether a failed idempotent Sheets call is worth retrying after a backoff."""
+    return (isinstance(error, gspread.exceptions.APIError)
+            and error.response.status_code in RETRYABLE_STATUS_CODES)
+
+def is_quota_error(error):
+    """Whether a Sheets call was rejected for quota, and so was not applied."""
+    return (isinstance(error, gspread.exceptions.APIError)
+            and error.response.status_code == QUOTA_STATUS_CODE)
+
+# Retries one Sheets API call with jittered exponential backoff (1s doubling to
+# 30s, 6 attempts), so a burst of 429s costs a short sleep instead of the
+# caller redoing the whole export. retry_sheets_call is for calls that are
+# safe to repeat (reads, writes to explicit ranges); calls that add tabs or
+# append rows use retry_on_quota, since after a 5xx they may already have
+# been applied and a repeat would fail ("already exists") or duplicate rows
+_backoff = dict(
+    wait=wait_exponential_jitter(initial=1, max=30),
+    stop=stop_after_attempt(6),
+    reraise=True
+)
+retry_sheets_call = retry(retry=retry_if_exception(is_retryable), **_backoff)
+retry_on_quota = retry(retry=retry_if_exception(is_quota_error), **_backoff)
+
+@retry_on_quota
+def batch_update(sh, body):
+    """spreadsheets.batchUpdate, retried on quota errors."""
+    return sh.batch_update(body)
+
+@retry_sheets_call
+def values_batch_update(sh, body):
+    """spreadsheets.values.batchUpdate (explicit ranges), retried on quota and server errors."""
+    return sh.values_batch_update(body)
+
+@retry_on_quota
+def values_append(sh, range_name, values):
+    """Append rows (stored as-is) after the data in range_name, retried on quota errors."""
+    return sh.values_append(range_name, {'valueInputOption': 'RAW'}, {'values': values})
+
+class OrjsonAuthorizedSession(AuthorizedSession):
+    """
+    AuthorizedSession that encodes JSON request bodies with orjson instead of
+    the stdlib json used by requests; bulk export payloads hold thousands of
+    rows, so this is most of the Python-side cost of a Sheets call.
+    """
+    def request(self, method, url, data=None, headers=None, **kwargs):
+        body = kwargs.pop('json', None)
+        if body is not None and data is None:
+            try:
+                data = orjson.dumps(body)
+                headers = {**(headers or {}), 'Content-Type': 'application/json'}
+            except TypeError:
+                # Not orjson-serializable (e.g. non-str keys): let requests encode it
+                kwargs['json'] = body
+        return super().request(method, url, data=data, headers=headers, **kwargs)
+
+def authorized_session(client):
+    """The google-auth session a gspread client sends its requests through."""
+    # gspread 6 keeps its session on http_client, gspread 5 on the client
+    return getattr(getattr(client, 'http_client', client), 'session', None)
+
 def get_gspread_client():
     """
-    Authenticate and return a gspread client.
+    Authenticate and return the shared gspread client.
     Requires 'credentials.json' in the root directory.
     """
-    if not os.path.exists('credentials.json'):
-        raise FileNotFoundError("credentials.json not found. Please add Google Service Account credentials to the root directory.")
-    
-    creds = ServiceAccountCredentials.from_json_keyfile_name('credentials.json', SCOPE)
-    client = gspread.authorize(creds)
-    return client
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                if not os.path.exists('credentials.json'):
+                    raise FileNotFoundError("credentials.json not found. Please add Google Service Account credentials to the root directory.")
+                
+                creds = Credentials.from_service_account_file('credentials.json', scopes=SCOPE)
+                # The AuthorizedSession refreshes the token in place on the
+                # same keep-alive connections
+                session = OrjsonAuthorizedSession(creds)
+                session.mount('https://', HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS,
+                                                      pool_maxsize=HTTP_POOL_MAXSIZE))
+                _client = gspread.Client(creds, session=session)
+    return _client
+
+def get_master_spreadsheet():
+    """Open the master spreadsheet once and return the shared handle."""
+    global _master_sheet
+    if _master_sheet is None:
+        client = get_gspread_client()
+        with _client_lock:
+            if _master_sheet is None:
+                _master_sheet = retry_sheets_call(client.open_by_key)(SPREADSHEET_ID)
+    return _master_sheet
 
 def create_or_get_sheet(client, title):
     """
@@ -38,119 +183,374 @@ def create_or_get_sheet(client, title):
     Note: Service accounts create sheets in their own drive. 
     You need to share it with your personal email to see it easily, 
     or we just return the URL.
+    Resolved ids are remembered for SHEET_ID_CACHE_TTL seconds, so repeat
+    calls open the sheet by key instead of searching Drive by title.
     """
+    with _sheet_ids_lock:
+        cached = _sheet_ids.get(title)
+    if cached is not None and time.monotonic() - cached[1] < SHEET_ID_CACHE_TTL:
+        try:
+            return client.open_by_key(cached[0])
+        except gspread.SpreadsheetNotFound:
+            # Deleted or unshared since it was cached; search again
+            pass
+    
     try:
         # Try to open existing
         sheet = client.open(title)
-        return sheet
     except gspread.SpreadsheetNotFound:
         # Create new
         sheet = client.create(title, folder_id=FOLDER_ID)
         # Make it accessible to anyone with the link (optional, but easier for demo)
         # sheet.share(None, perm_type='anyone', role='reader')
-        return sheet
-
-def format_header_row(worksheet):
-    """Apply formatting to the header row."""
-    worksheet.format('A1:Z1', {
-        "backgroundColor": {
-            "red": 0.21,
-            "green": 0.37,
-            "blue": 0.57
-        },
-        "textFormat": {
-            "foregroundColor": {
-                "red": 1.0,
-                "green": 1.0,
-                "blue": 1.0
-            },
-            "bold": True,
-            "fontSize": 11
+    
+    with _sheet_ids_lock:
+        _sheet_ids.pop(title, None)
+        _sheet_ids[title] = (sheet.id, time.monotonic())
+        if len(_sheet_ids) > SHEET_ID_CACHE_SIZE:
+            # Dicts keep insertion order, so the first entry is the oldest
+            del _sheet_ids[next(iter(_sheet_ids))]
+    return sheet
+
+# Header row style shared by every exported tab
+HEADER_FORMAT = {
+    "backgroundColor": {
+        "red": 0.21,
+        "green": 0.37,
+        "blue": 0.57
+    },
+    "textFormat": {
+        "foregroundColor": {
+            "red": 1.0,
+            "green": 1.0,
+            "blue": 1.0
         },
-        "horizontalAlignment": "CENTER"
-    })
+        "bold": True,
+        "fontSize": 11
+    },
+    "horizontalAlignment": "CENTER"
+}
 
-def export_single_result_to_gsheet(result_data, title=None):
+def cell_data(value):
+    """Wrap a Python value as Sheets API CellData, stored as-is (like RAW input)."""
+    if value is None:
+        return {}
+    if isinstance(value, bool):
+        return {"userEnteredValue": {"boolValue": value}}
+    if isinstance(value, (int, float)):
+        return {"userEnteredValue": {"numberValue": value}}
+    return {"userEnteredValue": {"stringValue": str(value)}}
+
+def new_tab_requests(sheet_id, title, rows, cols, values):
     """
-    Export a single diagnosis result to a Google Sheet (tabs in master spreadsheet).
+    Build the batchUpdate requests that add a tab, fill it with values
+    (header row first) and style its header row.
+
+    Args:
+        sheet_id: Id to give the new tab (chosen by the caller, so later
+            requests in the same batch can refer to it)
+        title: Tab title
+        rows: Grid row count
+        cols: Grid column count
+        values: List of rows, the first being the header
+
+    Returns:
+        List of request dicts for spreadsheets.batchUpdate
+    """
+    return [
+        {"addSheet": {"properties": {
+            "sheetId": sheet_id,
+            "title": title,
+            "gridProperties": {"rowCount": rows, "columnCount": cols}
+        }}},
+        {"updateCells": {
+            "start": {"sheetId": sheet_id, "rowIndex": 0, "columnIndex": 0},
+            "rows": [{"values": [cell_data(value) for value in row]} for row in values],
+            "fields": "userEnteredValue"
+        }},
+        {"repeatCell": {
+            "range": {"sheetId": sheet_id, "startRowIndex": 0, "endRowIndex": 1,
+                      "startColumnIndex": 0, "endColumnIndex": cols},
+            "cell": {"userEnteredFormat": HEADER_FORMAT},
+            "fields": "userEnteredFormat(backgroundColor,textFormat,horizontalAlignment)"
+        }}
+    ]
+
+def new_sheet_ids(count):
+    """Pick count distinct random tab ids (the API accepts any unused non-negative int32)."""
+    return random.sample(range(1, 2**31 - 1), count)
+
+def add_tab_with_header(sh, title, rows, cols, headers):
     """
-    client = get_gspread_client()
-    sh = client.open_by_key(SPREADSHEET_ID)
+    Add a tab with its styled header row in a single batchUpdate call.
+
+    Returns:
+        Sheet id (gid) of the new tab
+    """
+    (sheet_id,) = new_sheet_ids(1)
+    batch_update(sh, {"requests": new_tab_requests(sheet_id, title, rows, cols, [headers])})
+    return sheet_id
+
+def resize_tab(sh, sheet_id, rows):
+    """Set a tab's grid row count, e.g. to drop rows reserved for results that never arrived."""
+    # Setting a property is safe to repeat
+    retry_sheets_call(sh.batch_update)({"requests": [{"updateSheetProperties": {
+        "properties": {"sheetId": sheet_id, "gridProperties": {"rowCount": rows}},
+        "fields": "gridProperties.rowCount"
+    }}]})
+
+def delete_tab(sh, sheet_id):
+    """Delete a tab, e.g. one left half-written by a failed export (errors are ignored)."""
+    forget_failures_sheet_id(sheet_id)
+    try:
+        batch_update(sh, {"requests": [{"deleteSheet": {"sheetId": sheet_id}}]})
+    except Exception:
+        pass
+
+def write_rows_in_chunks(sh, title, rows, start_row=2, parallel=True):
+    """
+    Write rows from any iterable to the tab named title, starting at start_row.
+    Each ROWS_PER_WRITE-row chunk goes to its own fixed A1 range in one
+    values.batchUpdate call; since the ranges are known up front, up to
+    SHEETS_WRITE_CONCURRENCY calls run at once (appends would have to run in
+    order), and only that many chunks are held in memory.
+    With parallel=False the chunks are written one after another on the
+    calling thread (needed at interpreter exit, when executors refuse new work).
+    The tab must already have enough grid rows for every row.
     
-    domain = result_data.get('domain', 'unknown')
-    timestamp = datetime.now().strftime('%m%d_%H%M')
-    safe_domain = domain.replace('.', '_')[:15]
-    prefix = f"{safe_domain}_{timestamp}"
+    Returns:
+        Number of rows written
+    """
+    tab = "'{}'".format(title.replace("'", "''"))
+    
+    def write(first_row, values):
+        values_batch_update(sh, {
+            'valueInputOption': 'RAW',
+            'data': [{'range': f"{tab}!A{first_row}", 'values': values}]
+        })
+    
+    written = 0
+    
+    def chunks():
+        nonlocal written
+        chunk = []
+        first_row = start_row
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= ROWS_PER_WRITE:
+                written += len(chunk)
+                yield first_row, chunk
+                first_row += len(chunk)
+                chunk = []
+        if chunk:
+            written += len(chunk)
+            yield first_row, chunk
+    
+    if not parallel:
+        for first_row, chunk in chunks():
+            write(first_row, chunk)
+        return written
+    
+    with ThreadPoolExecutor(max_workers=SHEETS_WRITE_CONCURRENCY) as executor:
+        pending = []
+        for first_row, chunk in chunks():
+            if len(pending) >= SHEETS_WRITE_CONCURRENCY:
+                # Wait for the oldest write (re-raises its error)
+                pending.pop(0).result()
+            pending.append(executor.submit(write, first_row, chunk))
+        for future in pending:
+            future.result()
+    return written
+
+def single_result_tab_requests(result_data, prefix):
+    """
+    Build the batchUpdate requests for one result's tabs
+    (Overview, plus Tech/Vuln/Errors when there is data for them).
+
+    Args:
+        result_data: Diagnosis result dictionary
+        prefix: Tab title prefix, unique within the spreadsheet
+
+    Returns:
+        (Overview tab id, list of request dicts)
+    """
+    overview_id, obs_id, vuln_id, err_id = new_sheet_ids(4)
+    get = result_data.get
+    vulnerabilities = get('vulnerabilities', [])
+    console_errors = get('console_errors', [])
+    observation = get('technical_observation')
     
     # 1. Overview Tab
-    worksheet = sh.add_worksheet(title=f"{prefix}_Overview", rows=20, cols=2)
-    
-    overview_headers = ["Field", "Value"]
-    overview_rows = [
-        ["URL", result_data.get('url', 'N/A')],
-        ["Domain", result_data.get('domain', 'N/A')],
-        ["Technology", result_data.get('tech', 'Unknown')],
-        ["Status", result_data.get('status', 'unknown')],
-        ["Load Time", result_data.get('load_time', 'N/A')],
-        ["FCP (ms)", result_data.get('first_contentful_paint_ms', 'N/A')],
-        ["Console Error Count", result_data.get('console_error_count', 0)],
-        ["Vulnerability Detected", 'Yes' if result_data.get('vulnerability_detected', False) else 'No'],
-        ["Vulnerabilities Count", len(result_data.get('vulnerabilities', []))],
+    overview_values = [
+        ["Field", "Value"],
+        ["URL", get('url', 'N/A')],
+        ["Domain", get('domain', 'N/A')],
+        ["Technology", get('tech', 'Unknown')],
+        ["Status", get('status', 'unknown')],
+        ["Load Time", get('load_time', 'N/A')],
+        ["FCP (ms)", get('first_contentful_paint_ms', 'N/A')],
+        ["Console Error Count", get('console_error_count', 0)],
+        ["Vulnerability Detected", 'Yes' if get('vulnerability_detected', False) else 'No'],
+        ["Vulnerabilities Count", len(vulnerabilities)],
         ["Diagnosis Date", datetime.now().strftime('%Y-%m-%d %H:%M:%S')]
     ]
-    
-    worksheet.append_row(overview_headers)
-    worksheet.append_rows(overview_rows)
-    format_header_row(worksheet)
+    requests = new_tab_requests(overview_id, f"{prefix}_Overview", len(overview_values), 2, overview_values)
     
     # 2. Technical Observation
-    observation = result_data.get('technical_observation')
     if observation:
-        ws_obs = sh.add_worksheet(title=f"{prefix}_Tech", rows=10, cols=1)
-        ws_obs.append_row(["Technical Observation"])
-        ws_obs.append_row([observation])
-        format_header_row(ws_obs)
+        requests += new_tab_requests(obs_id, f"{prefix}_Tech", 2, 1, [["Technical Observation"], [observation]])
 
     # 3. Vulnerabilities
-    vulnerabilities = result_data.get('vulnerabilities', [])
     if vulnerabilities:
-        ws_vuln = sh.add_worksheet(title=f"{prefix}_Vuln", rows=max(len(vulnerabilities)+5, 10), cols=3)
-        ws_vuln.append_row(["Type", "Version", "Matched Text"])
         v_rows = [[v.get('type', 'N/A'), v.get('version', 'unknown'), v.get('matched_text', '')[:200]] for v in vulnerabilities]
-        ws_vuln.append_rows(v_rows)
-        format_header_row(ws_vuln)
+        requests += new_tab_requests(vuln_id, f"{prefix}_Vuln", len(v_rows)+1, 3,
+                                     [["Type", "Version", "Matched Text"]] + v_rows)
 
     # 4. Console Errors
-    console_errors = result_data.get('console_errors', [])
     if console_errors:
-        ws_err = sh.add_worksheet(title=f"{prefix}_Errors", rows=max(len(console_errors)+5, 10), cols=2)
-        ws_err.append_row(["Error Number", "Error Message"])
         e_rows = [[i, err] for i, err in enumerate(console_errors, 1)]
-        ws_err.append_rows(e_rows)
-        format_header_row(ws_err)
-        
-    return f"{sh.url}#gid={worksheet.id}"
+        requests += new_tab_requests(err_id, f"{prefix}_Errors", len(e_rows)+1, 2,
+                                     [["Error Number", "Error Message"]] + e_rows)
+    
+    return overview_id, requests
+
+def single_result_tab_prefix(result_data):
+    """Tab title prefix for a result: shortened domain plus the current minute."""
+    domain = result_data.get('domain', 'unknown')
+    timestamp = datetime.now().strftime('%m%d_%H%M')
+    safe_domain = domain.replace('.', '_')[:15]
+    return f"{safe_domain}_{timestamp}"
+
+def get_failures_sheet_id(sh):
+    """Return the gid of the shared Failures tab, adding it on first use."""
+    global _failures_sheet_id
+    if _failures_sheet_id is None:
+        with _failures_lock:
+            if _failures_sheet_id is None:
+                worksheets = retry_sheets_call(sh.worksheets)()
+                sheet_id = next((ws.id for ws in worksheets if ws.title == FAILURES_TAB_TITLE), None)
+                if sheet_id is None:
+                    sheet_id = add_tab_with_header(sh, FAILURES_TAB_TITLE, 1, len(FAILURES_HEADERS), FAILURES_HEADERS)
+                _failures_sheet_id = sheet_id
+    return _failures_sheet_id
+
+def forget_failures_sheet_id(sheet_id=None):
+    """Drop the cached Failures tab gid (only if it is sheet_id, when given)."""
+    global _failures_sheet_id
+    with _failures_lock:
+        if sheet_id is None or _failures_sheet_id == sheet_id:
+            _failures_sheet_id = None
+
+def append_failure_row(sh, result_data):
+    """
+    Log a failed diagnosis as one row of the shared Failures tab.
+    If the append fails (e.g. the tab was deleted by hand), the tab is looked
+    up again by title, or re-added, and the append tried once more.
 
-def export_bulk_results_to_gsheet(results_list, title=None):
+    Returns:
+        Sheet id (gid) of the Failures tab
+    """
+    row = [
+        result_data.get('url', 'N/A'),
+        result_data.get('domain', 'N/A'),
+        result_data.get('status', 'unknown'),
+        result_data.get('error', ''),
+        datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    ]
+    sheet_id = get_failures_sheet_id(sh)
+    try:
+        values_append(sh, f"'{FAILURES_TAB_TITLE}'", [row])
+    except gspread.exceptions.APIError:
+        forget_failures_sheet_id(sheet_id)
+        sheet_id = get_failures_sheet_id(sh)
+        values_append(sh, f"'{FAILURES_TAB_TITLE}'", [row])
+    return sheet_id
+
+def export_single_result_to_gsheet(result_data, title=None):
+    """
+    Export a single diagnosis result to a Google Sheet (tabs in master spreadsheet).
+    Failed diagnoses with nothing to report are appended to the Failures tab instead.
+    """
+    sh = get_master_spreadsheet()
+    
+    if result_data.get('status') in FAILED_STATUSES and not result_data.get('vulnerabilities'):
+        return f"{sh.url}#gid={append_failure_row(sh, result_data)}"
+    
+    # All tabs are created, filled and styled in a single batchUpdate call
+    overview_id, requests = single_result_tab_requests(result_data, single_result_tab_prefix(result_data))
+    batch_update(sh, {"requests": requests})
+    return f"{sh.url}#gid={overview_id}"
+
+def export_many_results_to_gsheet(results):
+    """
+    Export several diagnosis results as per-result tabs (like
+    export_single_result_to_gsheet) using as few API calls as possible:
+    RESULTS_PER_BATCH_UPDATE results share one batchUpdate, and up to
+    SHEETS_WRITE_CONCURRENCY of those calls are in flight at once.
+
+    Args:
+        results: List of diagnosis result dictionaries
+
+    Returns:
+        List of Overview tab URLs, in the order of results
+    """
+    sh = get_master_spreadsheet()
+    
+    overview_ids = []
+    batches = []
+    seen_prefixes = {}
+    for start in range(0, len(results), RESULTS_PER_BATCH_UPDATE):
+        requests = []
+        for result_data in results[start:start + RESULTS_PER_BATCH_UPDATE]:
+            # Same domain exported twice in one minute: number the later tabs
+            prefix = single_result_tab_prefix(result_data)
+            seen_prefixes[prefix] = seen_prefixes.get(prefix, 0) + 1
+            if seen_prefixes[prefix] > 1:
+                prefix = f"{prefix}_{seen_prefixes[prefix]}"
+            overview_id, result_requests = single_result_tab_requests(result_data, prefix)
+            overview_ids.append(overview_id)
+            requests += result_requests
+        batches.append({"requests": requests})
+    
+    if batches:
+        with ThreadPoolExecutor(max_workers=min(SHEETS_WRITE_CONCURRENCY, len(batches))) as executor:
+            # list() re-raises the first failed call
+            list(executor.map(lambda body: batch_update(sh, body), batches))
+    
+    return [f"{sh.url}#gid={overview_id}" for overview_id in overview_ids]
+
+def export_bulk_results_to_gsheet(results, title=None, total=None, parallel_writes=True):
     """
     Export multiple diagnosis results to the master Google Sheet as a new tab.
+    The tab is deleted again if writing its rows fails.
+    
+    Args:
+        results: List or iterable of diagnosis results (consumed lazily)
+        title: Unused, kept for compatibility
+        total: Number of results, required when results is not a list
+        parallel_writes: Write row chunks concurrently (see write_rows_in_chunks)
+    
+    Returns:
+        URL of the new tab, or None when there are no results
     """
-    client = get_gspread_client()
-    sh = client.open_by_key(SPREADSHEET_ID)
+    if total is None:
+        total = len(results)
+    if not total:
+        return None
     
-    timestamp = datetime.now().strftime('%m%d_%H%M%S')
-    worksheet = sh.add_worksheet(title=f"Bulk_{timestamp}", rows=len(results_list)+5, cols=11)
+    sh = get_master_spreadsheet()
     
+    timestamp = datetime.now().strftime('%m%d_%H%M%S')
     headers = [
         "No.", "URL", "Domain", "Technology", "Status", "Load Time", 
         "FCP (ms)", "Console Errors", "Vulnerabilities", 
         "Vulnerability Detected", "Technical Observation"
     ]
-    worksheet.append_row(headers)
+    title = f"Bulk_{timestamp}"
+    sheet_id = add_tab_with_header(sh, title, total+1, len(headers), headers)
     
-    rows = []
-    for idx, result in enumerate(results_list, 1):
-        rows.append([
+    rows = (
+        [
             idx,
             result.get('url', 'N/A'),
             result.get('domain', 'N/A'),
@@ -162,78 +562,198 @@ def export_bulk_results_to_gsheet(results_list, title=None):
             len(result.get('vulnerabilities', [])),
             'Yes' if result.get('vulnerability_detected', False) else 'No',
             result.get('technical_observation', 'N/A')
-        ])
+        ]
+        for idx, result in enumerate(results, 1)
+    )
+    try:
+        written = write_rows_in_chunks(sh, title, rows, parallel=parallel_writes)
+    except Exception:
+        delete_tab(sh, sheet_id)
+        raise
+    if written < total:
+        # Some results could not be read; drop their reserved rows
+        resize_tab(sh, sheet_id, written + 1)
+    
+    return f"{sh.url}#gid={sheet_id}"
+
+# Sheets rejects cells longer than this many characters
+MAX_CELL_LENGTH = 50000
+
+def format_vulnerability_list(vulnerabilities):
+    """
+    Format vulnerabilities as a comma-separated "type (vversion)" list,
+    cut off with "..." rather than exceeding MAX_CELL_LENGTH.
+    """
+    if not vulnerabilities:
+        return 'None'
+    buf = io.StringIO()
+    length = 0
+    for v in vulnerabilities:
+        text = f"{v.get('type', 'N/A')} (v{v.get('version', 'unknown')})"
+        separator = ', ' if length else ''
+        length += len(separator) + len(text)
+        if length > MAX_CELL_LENGTH - 5:
+            buf.write(separator + '...')
+            break
+        buf.write(separator)
+        buf.write(text)
+    return buf.getvalue()
+
+def queue_single_result(result_data):
+    """
+    Queue a diagnosis result for export as a row of a shared bulk tab, for
+    callers that export many results one at a time and do not need a tab per
+    result (use export_single_result_to_gsheet for that).
+    Every QUEUED_EXPORT_BATCH_SIZE results, and at exit, the queue is written
+    with a single export_bulk_results_to_gsheet call.
     
-    if rows:
-        worksheet.append_rows(rows)
+    Returns:
+        Future resolved with the bulk tab URL once the result is written
+    """
+    future = Future()
+    with _queued_results_lock:
+        _queued_results.append((result_data, future))
+        full = len(_queued_results) >= QUEUED_EXPORT_BATCH_SIZE
+    if full:
+        flush_queued_results()
+    return future
+
+def flush_queued_results(parallel_writes=True):
+    """
+    Write all queued results as one bulk tab and resolve their futures.
+    
+    Args:
+        parallel_writes: Passed to export_bulk_results_to_gsheet; False for the
+            flush at exit, which runs after executors stop accepting work
+    """
+    with _queued_results_lock:
+        queued = list(_queued_results)
+        _queued_results.clear()
+    if not queued:
+        return
+    try:
+        url = export_bulk_results_to_gsheet([result_data for result_data, _ in queued],
+                                            parallel_writes=parallel_writes)
+    except Exception as e:
+        for _, future in queued:
+            future.set_exception(e)
+        return
+    for _, future in queued:
+        future.set_result(url)
+
+atexit.register(flush_queued_results, parallel_writes=False)
+
+@retry_sheets_call
+def start_csv_upload(session, name):
+    """
+    Open a resumable Drive upload session for a CSV to be converted to a
+    Google Sheet in FOLDER_ID (nothing is created until the upload finishes).
+    
+    Returns:
+        Upload session URL
+    """
+    params = {'uploadType': 'resumable', 'supportsAllDrives': 'true', 'fields': 'id,webViewLink'}
+    response = session.post(DRIVE_UPLOAD_URL, params=params, json={
+        'name': name,
+        'mimeType': 'application/vnd.google-apps.spreadsheet',
+        'parents': [FOLDER_ID]
+    }, headers={'X-Upload-Content-Type': 'text/csv'})
+    if not response.ok:
+        raise gspread.exceptions.APIError(response)
+    return response.headers['Location']
+
+@retry_sheets_call
+def finish_csv_upload(session, upload_url, csv_file):
+    """
+    Send the whole CSV to an upload session. Repeating this against the same
+    session cannot create a second file, so it is retried like reads.
+    
+    Returns:
+        Drive file resource with 'id' and 'webViewLink'
+    """
+    csv_file.seek(0)
+    response = session.put(upload_url, data=csv_file, headers={'Content-Type': 'text/csv'})
+    if not response.ok:
+        raise gspread.exceptions.APIError(response)
+    return response.json()
+
+def upload_csv_as_spreadsheet(csv_file, name):
+    """
+    Upload a CSV file to FOLDER_ID with a resumable Drive upload, converting it
+    to a Google Sheet on the server side.
+    
+    Args:
+        csv_file: Binary file object holding the CSV
+        name: Name of the new spreadsheet
+    
+    Returns:
+        Drive file resource with 'id' and 'webViewLink'
+    """
+    session = authorized_session(get_gspread_client())
+    return finish_csv_upload(session, start_csv_upload(session, name), csv_file)
+
+def export_company_list_to_gsheet_csv(results, headers, now):
+    """
+    Export company diagnosis results as a new spreadsheet in FOLDER_ID, built
+    from a single CSV upload instead of Sheets API writes.
+    Rows are streamed to a temporary file, spilling to disk once it grows large.
+    
+    Args:
+        results: List or iterable of diagnosis results (consumed lazily)
+        headers: Header row
+        now: Current time as '%Y-%m-%d %H:%M:%S', see company_list_row()
+    
+    Returns:
+        URL of the new spreadsheet
+    """
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as csv_file:
+        text = io.TextIOWrapper(csv_file, encoding='utf-8', newline='')
+        writer = csv.writer(text)
+        writer.writerow(headers)
+        writer.writerows(company_list_row(result, now, format_vulnerability_list) for result in results)
+        text.flush()
         
-    format_header_row(worksheet)
-    return f"{sh.url}#gid={worksheet.id}"
+        name = f"Company_List_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        file_info = upload_csv_as_spreadsheet(csv_file, name)
+        text.detach()
+    return file_info.get('webViewLink') or f"https://docs.google.com/spreadsheets/d/{file_info['id']}"
 
-def export_company_list_to_gsheet(results_list, title=None):
+def export_company_list_to_gsheet(results, title=None, total=None):
     """
     Export all company diagnosis results to the master Google Sheet as a new tab.
+    Lists over CSV_UPLOAD_MIN_ROWS go to a new spreadsheet via a CSV upload
+    instead, when a Drive folder is configured.
+    
+    Args:
+        results: List or iterable of diagnosis results (consumed lazily)
+        title: Unused, kept for compatibility
+        total: Number of results, required when results is not a list
+    
+    Returns:
+        URL of the new tab or spreadsheet, or None when there are no results
     """
-    client = get_gspread_client()
-    sh = client.open_by_key(SPREADSHEET_ID)
+    if total is None:
+        total = len(results)
+    if not total:
+        return None
     
     timestamp = datetime.now().strftime('%m%d_%H%M%S')
-    worksheet = sh.add_worksheet(title=f"Export_{timestamp}", rows=len(results_list)+5, cols=13)
+    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     
-    headers = [
-        "Domain", "URL", "Technology", "Status", "Load Time", 
-        "FCP (ms)", "Console Errors Count", "Console Errors", 
-        "Vulnerabilities Count", "Vulnerabilities", "Vulnerability Detected",
-        "Technical Observation", "Diagnosis Date"
-    ]
-    worksheet.append_row(headers)
-    
-    rows = []
-    for result in results_list:
-        # Format vulnerabilities
-        vulnerabilities = result.get('vulnerabilities', [])
-        vuln_list = ', '.join([f"{v.get('type', 'N/A')} (v{v.get('version', 'unknown')})" 
-                              for v in vulnerabilities]) if vulnerabilities else 'None'
-        
-        # Format console errors
-        console_errors = result.get('console_errors', [])
-        if console_errors:
-            error_summary = []
-            for i, error in enumerate(console_errors[:3]):
-                truncated_error = error[:100] + '...' if len(error) > 100 else error
-                error_summary.append(f"{i+1}. {truncated_error}")
-            if len(console_errors) > 3:
-                error_summary.append(f"... and {len(console_errors) - 3} more errors")
-            console_errors_text = ' | '.join(error_summary)
-        else:
-            console_errors_text = 'None'
-            
-        # Date
-        diagnosis_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        if 'modified' in result:
-            try:
-                diagnosis_date = datetime.fromtimestamp(result['modified']).strftime('%Y-%m-%d %H:%M:%S')
-            except:
-                pass
-        
-        rows.append([
-            result.get('domain', 'N/A'),
-            result.get('url', 'N/A'),
-            result.get('tech', 'Unknown'),
-            result.get('status', 'unknown'),
-            result.get('load_time', 'N/A'),
-            result.get('first_contentful_paint_ms', 'N/A'),
-            result.get('console_error_count', 0),
-            console_errors_text,
-            len(vulnerabilities),
-            vuln_list,
-            'Yes' if result.get('vulnerability_detected', False) else 'No',
-            result.get('technical_observation', 'N/A'),
-            diagnosis_date
-        ])
-        
-    if rows:
-        worksheet.append_rows(rows)
+    if FOLDER_ID and total > CSV_UPLOAD_MIN_ROWS:
+        return export_company_list_to_gsheet_csv(results, COMPANY_LIST_HEADERS, now)
+    
+    sh = get_master_spreadsheet()
+    title = f"Export_{timestamp}"
+    sheet_id = add_tab_with_header(sh, title, total+1, len(COMPANY_LIST_HEADERS), COMPANY_LIST_HEADERS)
+    
+    try:
+        written = write_rows_in_chunks(sh, title, (company_list_row(result, now, format_vulnerability_list) for result in results))
+    except Exception:
+        delete_tab(sh, sheet_id)
+        raise
+    if written < total:
+        # Some results could not be read; drop their reserved rows
+        resize_tab(sh, sheet_id, written + 1)
     
-    format_header_row(worksheet)
-    return f"{sh.url}#gid={worksheet.id}"
+    return f"{sh.url}#gid={sheet_id}"
@@ -0,0 +1,18 @@
+"""
+Gunicorn Configuration
+Production server settings (picked up automatically by `gunicorn app:app`).
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+# A single worker process: bulk jobs, the /diagnose cache and the results
+# listing cache live in process memory, so they must not be split across
+# workers. Concurrency comes from threads instead; requests spend most of
+# their time waiting on page loads, Google APIs or disk, not holding the GIL.
+workers = 1
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 16))
+
+# A diagnosis can take well over the 30s default (page load + observation)
+timeout = 180
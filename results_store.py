@@ -0,0 +1,648 @@
+"""
+Results Storage Utility Module
+Handles reading and writing saved diagnosis result files.
+"""
+import os
+import time
+import sqlite3
+import functools
+import itertools
+import threading
+import contextlib
+import orjson
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+# ijson lets summaries be pulled from a result without building the full object
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+# pyarrow stores bulk result sets as columnar Parquet files
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+
+# Saved diagnosis results live here (relative to the working directory);
+# created once at import rather than on every request
+RESULTS_DIR = 'results'
+os.makedirs(RESULTS_DIR, exist_ok=True)
+
+# Diagnosis files are a few KB to a few hundred KB; a large buffer lets a
+# whole file move in one read()/write() call instead of st_blksize chunks.
+RESULT_IO_BUFFER = 1 << 17
+
+# Recently served result bodies kept in memory (results are a few KB to a
+# few hundred KB each)
+RESULT_BYTES_CACHE_SIZE = 128
+
+# Debug mode (FLASK_DEBUG set), read once; the environment doesn't change
+FLASK_DEBUG = bool(os.environ.get('FLASK_DEBUG'))
+
+# Result files are stored compact; pretty-printed only while debugging
+RESULT_JSON_OPTIONS = orjson.OPT_INDENT_2 if FLASK_DEBUG else 0
+
+class _SafeFilenameTable(dict):
+    """
+    str.translate() table mapping anything that is not alphanumeric, '_'
+    or '-' to '_'. Entries are filled in on first sight of each code point,
+    so any Unicode domain is handled without a 1.1M-entry table.
+    """
+
+    def __missing__(self, codepoint):
+        char = chr(codepoint)
+        safe = char if char.isalnum() or char in '_-' else '_'
+        self[codepoint] = safe
+        return safe
+
+
+_SAFE_FILENAME_CHARS = _SafeFilenameTable()
+
+# Top-level scalar fields copied into the listing summary
+SUMMARY_FIELDS = frozenset([
+    'url', 'domain', 'tech', 'status', 'load_time',
+    'console_error_count', 'vulnerability_detected'
+])
+
+# Keys written first in result files, so summaries can stop streaming early
+_LEADING_RESULT_KEYS = (
+    'url', 'domain', 'tech', 'status', 'load_time',
+    'console_error_count', 'vulnerability_detected', 'vulnerabilities'
+)
+
+# ijson events that carry a scalar value / open a new array item
+_SCALAR_EVENTS = frozenset(['string', 'number', 'boolean', 'null'])
+_ITEM_START_EVENTS = _SCALAR_EVENTS | {'start_map', 'start_array'}
+
+# Upper bound on threads used to read unindexed summaries in one sync
+SUMMARY_WORKERS = 16
+
+# Full-result reads (exports) go to a thread pool above this many files;
+# small batches aren't worth the thread start-up
+PARALLEL_READ_THRESHOLD = 50
+RESULT_READ_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+# Background threads for saves that the caller doesn't wait on
+RESULT_WRITER_WORKERS = 2
+_RESULT_WRITER = ThreadPoolExecutor(max_workers=RESULT_WRITER_WORKERS, thread_name_prefix='result-writer')
+
+# SQLite index of listing summaries, kept in a subdirectory so its journal
+# files never touch the results directory mtime (used to detect changes)
+INDEX_DIRNAME = '_index'
+INDEX_FILENAME = 'results.sqlite'
+
+# Listing columns in build_result_summary() order
+SUMMARY_COLUMNS = (
+    'url', 'domain', 'tech', 'status', 'load_time', 'console_error_count',
+    'vulnerability_detected', 'vulnerabilities_count'
+)
+
+# Bumped whenever the diag table changes; older indexes are rebuilt from disk
+_INDEX_SCHEMA_VERSION = 3
+
+_INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS diag (
+    filename TEXT PRIMARY KEY,
+    url TEXT,
+    domain TEXT,
+    tech TEXT,
+    status TEXT,
+    load_time TEXT,
+    console_error_count INT,
+    vulnerability_detected INT,
+    vulnerabilities_count INT,
+    load_time_seconds REAL,
+    domain_lower TEXT,
+    tech_lower TEXT,
+    modified REAL,
+    mtime_ns INT
+)
+"""
+
+# One index per listing sort key (and the status filter), so a page is an
+# index walk plus LIMIT instead of a full sort
+_INDEX_SORT_INDEXES = (
+    'CREATE INDEX IF NOT EXISTS diag_modified ON diag (modified)',
+    'CREATE INDEX IF NOT EXISTS diag_domain_lower ON diag (domain_lower)',
+    'CREATE INDEX IF NOT EXISTS diag_status ON diag (status)',
+    'CREATE INDEX IF NOT EXISTS diag_vulnerabilities_count ON diag (vulnerabilities_count)'
+)
+
+_UPSERT_SQL = (
+    f"INSERT OR REPLACE INTO diag (filename, {', '.join(SUMMARY_COLUMNS)}, "
+    f"load_time_seconds, domain_lower, tech_lower, modified, mtime_ns) "
+    f"VALUES ({', '.join('?' * (len(SUMMARY_COLUMNS) + 6))})"
+)
+
+# ORDER BY expressions for the listing sort options
+_SORT_EXPRESSIONS = {
+    'date': 'modified',
+    'domain': 'domain_lower',
+    'status': 'status',
+    'vulnerabilities': 'vulnerabilities_count'
+}
+
+# Index databases whose schema exists, and the results directory mtime
+# each index was last reconciled against
+_INITIALIZED_INDEXES = set()
+_SYNCED_DIR_MTIMES = {}
+
+# Changes whenever any index row is written or removed, so callers can
+# cache what they derive from the index
+_index_generations = itertools.count(1)
+_index_generation = 0
+
+
+@functools.lru_cache(maxsize=2048)
+def get_safe_filename(url):
+    """Convert URL to safe filename."""
+    try:
+        parsed = urlparse(url)
+    except ValueError:
+        # Fallback to timestamp if parsing fails (e.g. malformed IPv6 host)
+        return f"diagnosis_{int(time.time())}.json"
+    domain = parsed.netloc or parsed.path.split('/')[0]
+    # Remove www. and replace dots/special chars with underscores
+    domain = domain.replace('www.', '').translate(_SAFE_FILENAME_CHARS)
+    # Limit length
+    return f"diagnosis_{domain[:50]}.json"
+
+
+def read_result_file(filepath):
+    """
+    Read and parse a saved diagnosis result.
+
+    Args:
+        filepath: Path to the JSON result file
+
+    Returns:
+        Parsed result dictionary
+    """
+    with open(filepath, 'rb', buffering=RESULT_IO_BUFFER) as f:
+        return orjson.loads(f.read())
+
+
+def read_result_bytes(filepath, extra_fields=None, stat=None):
+    """
+    Read a saved diagnosis result as raw JSON bytes, ready to send.
+    Extra top-level fields are spliced into the closing brace instead of
+    parsing and re-serializing the whole document.
+
+    Args:
+        filepath: Path to the JSON result file
+        extra_fields: Optional dict of fields to append to the object
+        stat: os.stat() of the file; when given, bytes are reused from an
+            LRU cache for as long as the file's mtime and size are unchanged
+
+    Returns:
+        JSON bytes of the result object
+    """
+    if stat is not None:
+        extra_items = tuple(extra_fields.items()) if extra_fields else ()
+        return _read_result_bytes_cached(filepath, stat.st_mtime_ns, stat.st_size, extra_items)
+    return _read_result_bytes(filepath, extra_fields)
+
+
+@functools.lru_cache(maxsize=RESULT_BYTES_CACHE_SIZE)
+def _read_result_bytes_cached(filepath, mtime_ns, size, extra_items):
+    # mtime_ns and size are only part of the key: a changed file is a new entry
+    return _read_result_bytes(filepath, dict(extra_items))
+
+
+def _read_result_bytes(filepath, extra_fields):
+    with open(filepath, 'rb', buffering=RESULT_IO_BUFFER) as f:
+        body = f.read().rstrip()
+    if not extra_fields:
+        return body
+    if not body.endswith(b'}'):
+        # Not a JSON object (or not one we wrote); take the slow path
+        data = read_result_file(filepath)
+        data.update(extra_fields)
+        return orjson.dumps(data)
+
+    return splice_json_fields(body, extra_fields)
+
+
+def splice_json_fields(body, extra_fields):
+    """
+    Append top-level fields to serialized JSON object bytes without
+    re-encoding the rest of the object.
+
+    Args:
+        body: JSON bytes of an object (trailing whitespace allowed)
+        extra_fields: Dict of fields to append
+
+    Returns:
+        JSON bytes including the extra fields
+    """
+    extra = orjson.dumps(extra_fields)[1:]
+    head = body.rstrip()[:-1].rstrip()
+    separator = b'' if head.endswith(b'{') else b','
+    return head + separator + extra
+
+
+def serialize_result(result):
+    """Encode a diagnosis result exactly as it is stored on disk."""
+    return orjson.dumps(_summary_fields_first(result), option=RESULT_JSON_OPTIONS)
+
+
+def write_result_file(filepath, result, body=None):
+    """
+    Serialize a diagnosis result and write it to disk.
+    The file is written to a temporary name and moved into place, so a
+    crash mid-write never leaves a truncated result behind. Its summary
+    row is indexed right away so listings never need to re-read the file.
+
+    Args:
+        filepath: Destination path for the JSON result file
+        result: Diagnosis result dictionary
+        body: serialize_result(result), if the caller already encoded it
+    """
+    if body is None:
+        body = serialize_result(result)
+
+    # Unique per writer so concurrent saves of the same URL don't collide;
+    # the .tmp suffix keeps half-written files out of result scans
+    tmp_path = f"{filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'wb', buffering=RESULT_IO_BUFFER) as f:
+            f.write(body)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    stat = os.stat(filepath)
+    try:
+        with _connect(os.path.dirname(filepath)) as conn:
+            conn.execute(_UPSERT_SQL, _index_row(os.path.basename(filepath), stat, build_result_summary(result)))
+    except sqlite3.Error as e:
+        # The next listing re-indexes the file from disk
+        print(f"Failed to index result {filepath}: {str(e)}")
+    _bump_index_generation()
+
+
+def write_results_parquet(results, path):
+    """
+    Write a list of diagnosis results to one Parquet file (requires pyarrow).
+    The schema is inferred across all results; vulnerabilities and console
+    errors become list columns.
+
+    Args:
+        results: Non-empty list of diagnosis result dictionaries
+        path: Destination .parquet path
+    """
+    table = pa.Table.from_struct_array(pa.array(results))
+    pq.write_table(table, path)
+
+
+def iter_results_parquet(path, batch_size=500):
+    """
+    Yield the diagnosis results stored in a Parquet file, reading one record
+    batch at a time.
+
+    Args:
+        path: File written by write_results_parquet()
+        batch_size: Rows decoded per batch
+
+    Yields:
+        Result dictionaries; None values (e.g. first_contentful_paint_ms when
+        the paint was never observed) are kept, as in the JSON files
+    """
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+        yield from batch.to_pylist()
+
+
+def write_result_file_async(filepath, result, body=None):
+    """
+    Queue a diagnosis result to be written by a background thread.
+    A shallow copy is queued, so the caller may add top-level fields to
+    the result afterwards; nested values must be left as they are.
+
+    Args:
+        filepath: Destination path for the JSON result file
+        result: Diagnosis result dictionary
+        body: serialize_result(result), if the caller already encoded it
+
+    Returns:
+        Future that completes once the file is written
+    """
+    future = _RESULT_WRITER.submit(write_result_file, filepath, dict(result), body)
+    future.add_done_callback(lambda f: _report_write_failure(filepath, f))
+    return future
+
+
+def _summary_fields_first(result):
+    """Reorder a result so the listing fields lead the file."""
+    ordered = {key: result[key] for key in _LEADING_RESULT_KEYS if key in result}
+    ordered.update(result)
+    return ordered
+
+
+def _report_write_failure(filepath, future):
+    error = future.exception()
+    if error is not None:
+        print(f"Failed to save result {filepath}: {str(error)}")
+
+
+def delete_result_file(filepath):
+    """Delete a saved diagnosis result along with its index row."""
+    os.remove(filepath)
+    try:
+        with _connect(os.path.dirname(filepath)) as conn:
+            conn.execute('DELETE FROM diag WHERE filename = ?', (os.path.basename(filepath),))
+    except sqlite3.Error as e:
+        print(f"Failed to unindex result {filepath}: {str(e)}")
+    _bump_index_generation()
+
+
+def build_result_summary(data):
+    """Extract the fields shown in the results listing from a diagnosis result."""
+    return {
+        'url': data.get('url', ''),
+        'domain': data.get('domain', ''),
+        'tech': data.get('tech', 'Unknown'),
+        'status': data.get('status', 'unknown'),
+        'load_time': data.get('load_time', 'N/A'),
+        'console_error_count': data.get('console_error_count', 0),
+        'vulnerability_detected': data.get('vulnerability_detected', False),
+        'vulnerabilities_count': len(data.get('vulnerabilities', []))
+    }
+
+
+def query_result_summaries(results_dir, search='', status='', vulnerability='',
+                           sort_by='date', sort_order='desc', limit=-1, offset=0):
+    """
+    Filter, sort and page the indexed result summaries in SQL.
+    The directory is only rescanned when its mtime shows files were added,
+    replaced or removed.
+
+    Args:
+        results_dir: Directory containing the JSON result files
+        search: Lowercase text to find in the domain or tech
+        status: Exact status to match
+        vulnerability: 'yes' or 'no' to filter on vulnerability_detected
+        sort_by: One of 'date', 'domain', 'status', 'vulnerabilities'
+        sort_order: 'asc' or 'desc'
+        limit: Maximum rows to return (-1 for all)
+        offset: Number of matching rows to skip
+
+    Returns:
+        Tuple of (rows, total, with_vulnerabilities), where rows is a list of
+        (filename, modified, summary) tuples and the counts cover all matches
+    """
+    sync_result_index(results_dir)
+    where, params = _filter_clause(search, status, vulnerability)
+    order = ''
+    if sort_by in _SORT_EXPRESSIONS:
+        direction = 'DESC' if sort_order == 'desc' else 'ASC'
+        order = f" ORDER BY {_SORT_EXPRESSIONS[sort_by]} {direction}"
+
+    with _connect(results_dir) as conn:
+        total, with_vulnerabilities = conn.execute(
+            f"SELECT COUNT(*), TOTAL(IFNULL(vulnerability_detected, 0) != 0) FROM diag{where}", params
+        ).fetchone()
+        rows = conn.execute(
+            f"SELECT filename, modified, {', '.join(SUMMARY_COLUMNS)} FROM diag{where}{order} LIMIT ? OFFSET ?",
+            params + [limit, max(offset, 0)]
+        ).fetchall()
+    rows = [(row[0], row[1], _row_to_summary(row[2:])) for row in rows]
+    return rows, total, int(with_vulnerabilities)
+
+
+def read_indexed_results(results_dir, rows):
+    """
+    Read the full diagnosis result for each row from query_result_summaries().
+    Large batches are read on a thread pool; order follows the rows.
+    Each result gets its 'modified' timestamp; unreadable files are skipped.
+    """
+    def load(row):
+        filename, modified, _ = row
+        try:
+            data = read_result_file(os.path.join(results_dir, filename))
+        except Exception:
+            return None
+        data['modified'] = modified
+        return data
+
+    if len(rows) > PARALLEL_READ_THRESHOLD:
+        with ThreadPoolExecutor(max_workers=min(RESULT_READ_WORKERS, len(rows))) as executor:
+            results = list(executor.map(load, rows))
+    else:
+        results = [load(row) for row in rows]
+    return [data for data in results if data is not None]
+
+
+def iter_indexed_results(results_dir, rows, batch_size=500):
+    """
+    Lazily read full results for rows from query_result_summaries(), one
+    batch at a time, so exports never hold every result in memory.
+    """
+    for start in range(0, len(rows), batch_size):
+        yield from read_indexed_results(results_dir, rows[start:start + batch_size])
+
+
+def average_load_time(results_dir):
+    """Mean load time in seconds over every indexed result, or 0 if none have one."""
+    sync_result_index(results_dir)
+    with _connect(results_dir) as conn:
+        average, = conn.execute('SELECT AVG(load_time_seconds) FROM diag').fetchone()
+    return average or 0
+
+
+def sync_result_index(results_dir):
+    """
+    Reconcile the index with the result files on disk.
+    Only files whose mtime differs from their indexed row are parsed
+    (on a thread pool); rows for deleted files are dropped.
+
+    Args:
+        results_dir: Directory containing the JSON result files
+    """
+    try:
+        dir_mtime = os.stat(results_dir).st_mtime_ns
+    except OSError:
+        return
+    if _SYNCED_DIR_MTIMES.get(results_dir) == dir_mtime:
+        return
+
+    with _connect(results_dir) as conn:
+        indexed = dict(conn.execute('SELECT filename, mtime_ns FROM diag'))
+
+    existing = set()
+    misses = []
+    with os.scandir(results_dir) as entries:
+        for entry in entries:
+            if not entry.name.endswith('.json'):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            existing.add(entry.name)
+            if indexed.get(entry.name) != stat.st_mtime_ns:
+                misses.append((entry, stat))
+
+    loaded = []
+    if misses:
+        workers = min(SUMMARY_WORKERS, len(misses))
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                loaded = list(executor.map(_load_index_row, misses))
+        else:
+            loaded = [_load_index_row(miss) for miss in misses]
+
+    removed = [(name,) for name in indexed if name not in existing]
+    # Corrupted files come back as None and stay unindexed
+    upserts = [row for row in loaded if row is not None]
+    if removed or upserts:
+        with _connect(results_dir) as conn:
+            conn.executemany('DELETE FROM diag WHERE filename = ?', removed)
+            conn.executemany(_UPSERT_SQL, upserts)
+        _bump_index_generation()
+
+    # Recorded as seen before the scan, so changes made during it trigger another
+    _SYNCED_DIR_MTIMES[results_dir] = dir_mtime
+
+
+def result_index_generation(results_dir):
+    """
+    Sync the index and return a token that changes whenever its contents do.
+    Anything computed from the index at one generation stays valid until
+    the token changes.
+    """
+    sync_result_index(results_dir)
+    return _index_generation
+
+
+def _bump_index_generation():
+    global _index_generation
+    _index_generation = next(_index_generations)
+
+
+def _load_index_row(miss):
+    """Build the index row for an unindexed file; returns None for unreadable files."""
+    entry, stat = miss
+    try:
+        return _index_row(entry.name, stat, _summarize_result_file(entry.path))
+    except Exception:
+        return None
+
+
+def _index_row(filename, stat, summary):
+    return (
+        (filename,)
+        + tuple(summary[column] for column in SUMMARY_COLUMNS)
+        + (
+            _parse_load_time(summary['load_time']),
+            _lower(summary['domain']),
+            _lower(summary['tech']),
+            stat.st_mtime,
+            stat.st_mtime_ns
+        )
+    )
+
+
+def _parse_load_time(load_time):
+    """Extract seconds from a load time string (e.g., "2.3s" -> 2.3); None if unknown."""
+    try:
+        return float(load_time.replace('s', '').strip())
+    except (AttributeError, ValueError):
+        return None
+
+
+def _lower(value):
+    """Lowercase for search/sort columns (Unicode-aware, unlike SQLite's lower())."""
+    return value.lower() if isinstance(value, str) else ''
+
+
+def _filter_clause(search, status, vulnerability):
+    """Build the WHERE clause and parameters for the listing filters."""
+    conditions = []
+    params = []
+    if search:
+        conditions.append('(instr(domain_lower, ?) > 0 OR instr(tech_lower, ?) > 0)')
+        params += [search, search]
+    if status:
+        conditions.append('status = ?')
+        params.append(status)
+    if vulnerability == 'yes':
+        conditions.append('IFNULL(vulnerability_detected, 0) != 0')
+    elif vulnerability == 'no':
+        conditions.append('IFNULL(vulnerability_detected, 0) = 0')
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+    return where, params
+
+
+def _row_to_summary(values):
+    summary = dict(zip(SUMMARY_COLUMNS, values))
+    summary['vulnerability_detected'] = bool(summary['vulnerability_detected'])
+    return summary
+
+
+@contextlib.contextmanager
+def _connect(results_dir):
+    """Open the results index, committing on success and rolling back on error."""
+    index_path = os.path.join(results_dir, INDEX_DIRNAME, INDEX_FILENAME)
+    if index_path not in _INITIALIZED_INDEXES:
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    conn = sqlite3.connect(index_path, timeout=30)
+    try:
+        with conn:
+            if index_path not in _INITIALIZED_INDEXES:
+                version, = conn.execute('PRAGMA user_version').fetchone()
+                if version != _INDEX_SCHEMA_VERSION:
+                    # Rebuilt from the result files by the next sync
+                    conn.execute('DROP TABLE IF EXISTS diag')
+                    _SYNCED_DIR_MTIMES.pop(results_dir, None)
+                conn.execute(_INDEX_SCHEMA)
+                for statement in _INDEX_SORT_INDEXES:
+                    conn.execute(statement)
+                conn.execute(f'PRAGMA user_version = {_INDEX_SCHEMA_VERSION}')
+                _INITIALIZED_INDEXES.add(index_path)
+            yield conn
+    finally:
+        conn.close()
+
+
+def _summarize_result_file(filepath):
+    """
+    Build a listing summary straight from a result file.
+    With ijson the file is streamed: only the top-level scalars are kept
+    and vulnerabilities are counted without materializing the list.
+    Streaming stops once every summary field and the whole vulnerabilities
+    list have been seen, which for files written by write_result_file()
+    is within the first few hundred bytes.
+    """
+    if not IJSON_AVAILABLE:
+        return build_result_summary(read_result_file(filepath))
+
+    fields = {}
+    vulnerabilities_count = 0
+    vulnerabilities_done = False
+    with open(filepath, 'rb', buffering=RESULT_IO_BUFFER) as f:
+        for prefix, event, value in ijson.parse(f, use_float=True):
+            if prefix == 'vulnerabilities.item':
+                if event in _ITEM_START_EVENTS:
+                    vulnerabilities_count += 1
+            elif prefix in SUMMARY_FIELDS and event in _SCALAR_EVENTS:
+                fields[prefix] = value
+                if vulnerabilities_done and len(fields) == len(SUMMARY_FIELDS):
+                    break
+            elif prefix == 'vulnerabilities' and event == 'end_array':
+                vulnerabilities_done = True
+                if len(fields) == len(SUMMARY_FIELDS):
+                    break
+
+    summary = build_result_summary(fields)
+    summary['vulnerabilities_count'] = vulnerabilities_count
+    return summary
@@ -1,6 +1,6 @@
 import os
 import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+from google.oauth2.service_account import Credentials
 
 print("Checking for credentials.json...")
 if not os.path.exists('credentials.json'):
@@ -16,7 +16,7 @@ try:
         "https://www.googleapis.com/auth/drive.file",
         "https://www.googleapis.com/auth/drive"
     ]
-    creds = ServiceAccountCredentials.from_json_keyfile_name('credentials.json', scope)
+    creds = Credentials.from_service_account_file('credentials.json', scopes=scope)
     client = gspread.authorize(creds)
     print("✅ Authenticated successfully.")
     